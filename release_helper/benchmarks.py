@@ -0,0 +1,542 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Benchmarks for the release helper.
+
+Run ``python -m release_helper.benchmarks --help`` for usage.
+"""
+
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from contextlib import redirect_stdout
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from tempfile import TemporaryDirectory
+from threading import Thread
+from urllib.parse import urlparse
+
+import click
+
+# Modules that must only be imported by the commands that use them
+HEAVY_MODULES = [
+    "github",
+    "github_activity",
+    "numpy",
+    "pandas",
+    "requests",
+    "tarfile",
+    "urllib3",
+]
+
+IMPORT_TIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+# The synthetic repository served by the fake GitHub API
+BENCH_REPO = "bench-org/bench-repo"
+BENCH_SCALES = (10, 1000, 10000)
+BENCH_TAGS = 100
+BENCH_DIST_SIZE = 1 << 20
+RELEASE_DATE = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def get_commands():
+    """Get the names of the release helper subcommands"""
+    from release_helper.cli import main
+
+    return list(main.commands)
+
+
+def measure_startup(args=()):
+    """Measure the cold start of ``release-helper <args> --help``.
+
+    Parameters
+    ----------
+    args : sequence of str, optional
+        The subcommand arguments
+
+    Returns
+    -------
+    dict
+        The total ``import_us`` reported by ``python -X importtime``, the
+        ``wall_s`` of the process, and the sorted ``modules`` that were imported
+    """
+    cmd = [sys.executable, "-X", "importtime", "-m", "release_helper"]
+    cmd += list(args) + ["--help"]
+
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    wall = time.perf_counter() - start
+    if proc.returncode:  # pragma: no cover
+        raise ValueError(proc.stderr.decode("utf-8"))
+
+    import_us = 0
+    modules = set()
+    for line in proc.stderr.decode("utf-8").splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules.add(name)
+        # Only count the top level imports, the rest are nested in them
+        if len(indent) == 1:
+            import_us += int(cumulative)
+
+    return dict(import_us=import_us, wall_s=wall, modules=sorted(modules))
+
+
+def check_startup(results, baseline=None, tolerance=0.25):
+    """Check startup results for heavy imports and regressions.
+
+    Parameters
+    ----------
+    results : dict
+        A mapping of command name to the output of :func:`measure_startup`
+    baseline : dict, optional
+        Previous results to compare against
+    tolerance : float, optional
+        The allowed relative increase in import time over the baseline
+
+    Returns
+    -------
+    list of str
+        A description of each problem found
+    """
+    errors = []
+    for (name, result) in results.items():
+        heavy = sorted(set(HEAVY_MODULES) & set(result["modules"]))
+        if heavy:
+            errors.append(f"{name} imports {', '.join(heavy)}")
+        if baseline and name in baseline:
+            limit = baseline[name]["import_us"] * (1 + tolerance)
+            if result["import_us"] > limit:
+                errors.append(
+                    f"{name} import time {result['import_us']}us exceeds {limit:.0f}us"
+                )
+    return errors
+
+
+def make_pull_requests(count, since=RELEASE_DATE):
+    """Make GraphQL nodes for PRs merged after ``since``, most recent first"""
+    nodes = []
+    for number in range(count, 0, -1):
+        merged = (since + timedelta(minutes=number)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        nodes.append(
+            dict(
+                number=number,
+                title=f"Change number {number}",
+                url=f"https://github.com/{BENCH_REPO}/pull/{number}",
+                mergedAt=merged,
+                updatedAt=merged,
+                author=dict(login=f"user{number % 50}"),
+                mergeCommit=dict(oid=f"{number:040x}"),
+                labels=dict(nodes=[dict(name="enhancement")]),
+            )
+        )
+    return nodes
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """Serve the parts of the GitHub API used by a release"""
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        path = urlparse(self.path).path.strip("/")
+        if path == f"repos/{BENCH_REPO}":
+            self.send_json(self.server.repo_data())
+        else:
+            self.send_json(dict(message="Not Found"), 404)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        path = urlparse(self.path).path.strip("/")
+        body = self.read_json()
+        if path == "graphql":
+            variables = body["variables"]
+            start = int(variables.get("cursor") or 0)
+            nodes = self.server.prs[start : start + variables["first"]]
+            end = start + len(nodes)
+            page = dict(
+                pageInfo=dict(
+                    endCursor=str(end), hasNextPage=end < len(self.server.prs)
+                ),
+                nodes=nodes,
+            )
+            self.send_json(dict(data=dict(repository=dict(pullRequests=page))))
+        elif path == f"repos/{BENCH_REPO}/releases":
+            self.send_json(self.server.release_data(body), 201)
+        else:
+            self.send_json(dict(message="Not Found"), 404)
+
+    def do_DELETE(self):
+        time.sleep(self.server.latency)
+        self.send_response(204)
+        self.end_headers()
+
+
+class FakeGitHub(ThreadingMixIn, HTTPServer):
+    """A local stand-in for the GitHub API with synthetic data.
+
+    Use it as a context manager to serve requests from a background thread.
+
+    Parameters
+    ----------
+    prs : int
+        The number of merged PRs in the repository
+    latency : float, optional
+        The delay in seconds before each response
+    """
+
+    daemon_threads = True
+
+    def __init__(self, prs, latency=0.0):
+        super().__init__(("127.0.0.1", 0), FakeGitHubHandler)
+        self.latency = latency
+        self.prs = make_pull_requests(prs)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def repo_data(self):
+        owner, name = BENCH_REPO.split("/")
+        return dict(
+            id=1,
+            name=name,
+            full_name=BENCH_REPO,
+            url=f"{self.url}/repos/{BENCH_REPO}",
+            html_url=f"https://github.com/{BENCH_REPO}",
+            owner=dict(login=owner, id=1, type="Organization"),
+        )
+
+    def release_data(self, body):
+        return dict(
+            id=1,
+            url=f"{self.url}/repos/{BENCH_REPO}/releases/1",
+            html_url=f"https://github.com/{BENCH_REPO}/releases/{body['tag_name']}",
+            tag_name=body["tag_name"],
+            name=body.get("name"),
+            body=body.get("body"),
+            draft=body.get("draft", False),
+            prerelease=body.get("prerelease", False),
+        )
+
+    def __enter__(self):
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def git(*args, cwd=None, env=None):
+    """Run a git command quietly and return its output"""
+    return subprocess.check_output(
+        ["git"] + list(args), cwd=cwd, env=env, stderr=subprocess.STDOUT
+    ).decode("utf-8")
+
+
+def make_repo(path, tags=BENCH_TAGS):
+    """Make a git repository with a Python package released at ``RELEASE_DATE``.
+
+    The release commit has ``tags`` version tags, and there is one commit
+    after it.  The repository is its own ``upstream`` remote.
+    """
+    from release_helper.changelog import END_MARKER
+    from release_helper.changelog import START_MARKER
+
+    path = Path(path)
+    git("init", "-q", cwd=path)
+    git("checkout", "-q", "-b", "main", cwd=path)
+    git("config", "user.name", "bench", cwd=path)
+    git("config", "user.email", "bench@example.com", cwd=path)
+
+    path.joinpath(".gitignore").write_text("dist/\n", encoding="utf-8")
+    path.joinpath("setup.py").write_text(
+        "from setuptools import setup\nsetup()\n", encoding="utf-8"
+    )
+    path.joinpath("setup.cfg").write_text(
+        "[metadata]\nname = bench\nversion = 1.0.0\n", encoding="utf-8"
+    )
+    path.joinpath("CHANGELOG.md").write_text(
+        f"# Changelog\n\n{START_MARKER}\n\n{END_MARKER}\n", encoding="utf-8"
+    )
+    env = dict(os.environ, GIT_COMMITTER_DATE=RELEASE_DATE.isoformat())
+    git("add", ".", cwd=path)
+    git("commit", "-q", "-m", "Release", cwd=path, env=env)
+
+    sha = git("rev-parse", "HEAD", cwd=path).strip()
+    refs = "".join(f"create refs/tags/v0.{ind}.0 {sha}\n" for ind in range(tags))
+    subprocess.run(
+        ["git", "update-ref", "--stdin"],
+        input=refs.encode("utf-8"),
+        cwd=path,
+        check=True,
+    )
+
+    path.joinpath("README.md").write_text("Benchmark package\n", encoding="utf-8")
+    git("add", ".", cwd=path)
+    git("commit", "-q", "-m", "Add readme", cwd=path)
+    git("remote", "add", "upstream", str(path), cwd=path)
+    git("fetch", "-q", "upstream", cwd=path)
+
+    dist = path / "dist"
+    dist.mkdir()
+    for name in ["bench-1.0.0.tar.gz", "bench-1.0.0-py3-none-any.whl"]:
+        dist.joinpath(name).write_bytes(os.urandom(BENCH_DIST_SIZE))
+
+
+@contextmanager
+def bench_env(path, api_url):
+    """Run in ``path`` against a fake GitHub API with an empty cache"""
+    prev_dir = os.getcwd()
+    prev_env = os.environ.copy()
+    for name in [
+        "GITHUB_ACTIONS",
+        "GITHUB_BASE_REF",
+        "GITHUB_REF",
+        "GITHUB_REPOSITORY",
+    ]:
+        os.environ.pop(name, None)
+    os.environ["GITHUB_API_URL"] = api_url
+    os.environ["RELEASE_HELPER_CACHE_DIR"] = str(Path(path) / ".cache")
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev_dir)
+        os.environ.clear()
+        os.environ.update(prev_env)
+
+
+def time_call(func, setup, repeat):
+    """Get the best time in seconds of ``repeat`` calls, with output hidden"""
+    times = []
+    for _ in range(repeat):
+        setup()
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure_release(prs, tags=BENCH_TAGS, latency=0.0, repeat=3):
+    """Time the release steps against a fake GitHub API.
+
+    Each step starts from an empty cache, so all of its PRs are fetched.
+
+    Parameters
+    ----------
+    prs : int
+        The number of PRs merged since the last release
+    tags : int, optional
+        The number of tags in the repository
+    latency : float, optional
+        The delay in seconds before each API response
+    repeat : int, optional
+        The number of runs of each step, the fastest is kept
+
+    Returns
+    -------
+    dict
+        A mapping of step name to seconds
+    """
+    from release_helper import cli
+
+    common = ["--branch", "main", "--repo", BENCH_REPO]
+    changelog = ["--changelog-engine", "graphql"]
+
+    with TemporaryDirectory() as td, FakeGitHub(prs, latency) as server:
+        make_repo(td, tags)
+        with bench_env(td, server.url):
+            head = git("rev-parse", "HEAD").strip()
+            cache_dir = os.environ["RELEASE_HELPER_CACHE_DIR"]
+
+            def reset():
+                git("reset", "-q", "--hard", head)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+
+            def invoke(*args):
+                cli.main(list(args), standalone_mode=False)
+
+            with redirect_stdout(io.StringIO()):
+                reset()
+                invoke("prep-changelog", *common, *changelog)
+                prepped = Path("CHANGELOG.md").read_text(encoding="utf-8")
+
+            def prepare():
+                reset()
+                Path("CHANGELOG.md").write_text(prepped, encoding="utf-8")
+
+            steps = dict(
+                get_changelog_entry=(
+                    lambda: cli.get_changelog_entry(
+                        "upstream/main", BENCH_REPO, "1.0.0", engine="graphql"
+                    ),
+                    reset,
+                ),
+                prep_changelog=(
+                    lambda: invoke("prep-changelog", *common, *changelog),
+                    reset,
+                ),
+                check_changelog=(
+                    lambda: invoke("check-changelog", *common, *changelog),
+                    prepare,
+                ),
+                create_release_commit=(
+                    lambda: cli.create_release_commit("1.0.0"),
+                    prepare,
+                ),
+                publish_release=(
+                    lambda: invoke("publish-release", *common, "--dry-run"),
+                    prepare,
+                ),
+            )
+            return {
+                name: time_call(func, setup, repeat)
+                for (name, (func, setup)) in steps.items()
+            }
+
+
+def check_release(results, baseline=None, tolerance=0.25):
+    """Check release benchmark results for regressions.
+
+    Parameters
+    ----------
+    results : dict
+        The results of the ``release`` benchmark command
+    baseline : dict, optional
+        Previous results to compare against
+    tolerance : float, optional
+        The allowed relative increase in time over the baseline
+
+    Returns
+    -------
+    list of str
+        A description of each regression found
+    """
+    errors = []
+    if not baseline:
+        return errors
+    previous = baseline["scales"]
+    for (scale, steps) in results["scales"].items():
+        for (name, seconds) in steps.items():
+            if name not in previous.get(scale, dict()):
+                continue
+            limit = previous[scale][name] * (1 + tolerance)
+            if seconds > limit:
+                errors.append(
+                    f"{name} with {scale} PRs took {seconds:.3f}s, over {limit:.3f}s "
+                    f"for version {baseline['version']}"
+                )
+    return errors
+
+
+@click.group()
+def main():
+    """Release helper benchmarks"""
+    pass
+
+
+@main.command()
+@click.option("--output", help="File to write the results to")
+@click.option("--baseline", help="File with previous results to compare against")
+@click.option(
+    "--tolerance",
+    default=0.25,
+    help="Allowed relative increase in import time over the baseline",
+)
+def startup(output, baseline, tolerance):
+    """Measure the cold start time of each subcommand"""
+    results = dict()
+    for name in [""] + get_commands():
+        args = [name] if name else []
+        results[name or "main"] = result = measure_startup(args)
+        print(f"{name or 'main':<20} {result['import_us'] / 1000:8.1f}ms imports")
+
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if baseline:
+        baseline = json.loads(Path(baseline).read_text(encoding="utf-8"))
+
+    errors = check_startup(results, baseline, tolerance)
+    if errors:
+        raise ValueError("\n".join(errors))
+
+
+@main.command()
+@click.option(
+    "--scale",
+    type=int,
+    multiple=True,
+    default=BENCH_SCALES,
+    help="The number of PRs in the release, can be given more than once",
+)
+@click.option("--tags", default=BENCH_TAGS, help="The number of tags in the repo")
+@click.option(
+    "--latency", default=0.0, help="The delay in seconds of each API response"
+)
+@click.option("--repeat", default=3, help="The number of runs of each step")
+@click.option("--output", help="File to write the results to")
+@click.option("--baseline", help="File with previous results to compare against")
+@click.option(
+    "--tolerance",
+    default=0.25,
+    help="Allowed relative increase in time over the baseline",
+)
+def release(scale, tags, latency, repeat, output, baseline, tolerance):
+    """Time the release steps against a fake GitHub API"""
+    from release_helper import __version__
+
+    results = dict(
+        version=__version__,
+        python=platform.python_version(),
+        tags=tags,
+        latency=latency,
+        scales=dict(),
+    )
+    for prs in scale:
+        results["scales"][str(prs)] = steps = measure_release(
+            prs, tags, latency, repeat
+        )
+        for (name, seconds) in steps.items():
+            print(f"{name:<24} {prs:>6} PRs {seconds:8.3f}s")
+
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if baseline:
+        baseline = json.loads(Path(baseline).read_text(encoding="utf-8"))
+
+    errors = check_release(results, baseline, tolerance)
+    if errors:
+        raise ValueError("\n".join(errors))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
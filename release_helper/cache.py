@@ -0,0 +1,268 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+import json
+import os
+import os.path as osp
+import shutil
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+DEFAULT_CACHE_DIR = "~/.cache/release-helper"
+PR_CACHE_TTL = 86400
+PR_CACHE_MAX_AGE = 90 * 86400
+PR_CACHE_MAX_ENTRIES = 20000
+ENTRY_CACHE_TTL = 86400
+VENV_CACHE_MAX_AGE = 30 * 86400
+VENV_CACHE_MAX_ENTRIES = 5
+BUILD_CACHE_MAX_AGE = 30 * 86400
+BUILD_CACHE_MAX_ENTRIES = 20
+BUILD_CACHE_MAX_SIZE = 1 << 30
+LINK_CACHE_MAX_AGE = 90 * 86400
+
+CacheEntry = namedtuple("CacheEntry", ["data", "etag", "fresh"])
+
+
+def get_cache_dir():
+    """Get the release helper cache directory, creating it if needed"""
+    path = os.environ.get("RELEASE_HELPER_CACHE_DIR", DEFAULT_CACHE_DIR)
+    path = osp.expanduser(path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on a file, waiting for other processes to release it"""
+    with open(path, "a") as fid:
+        if os.name == "nt":  # pragma: no cover
+            import msvcrt
+
+            msvcrt.locking(fid.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                fid.seek(0)
+                msvcrt.locking(fid.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fid, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fid, fcntl.LOCK_UN)
+
+
+def get_dir_size(path):
+    """Get the total size of the files in a directory tree"""
+    size = 0
+    for (root, _, files) in os.walk(path):
+        for name in files:
+            size += os.lstat(osp.join(root, name)).st_size
+    return size
+
+
+def evict_dirs(path, max_age, max_entries, max_size=None):
+    """Remove the least recently used directories in a cache directory.
+
+    The modification time of each directory marks its last use.  Directories
+    that have not been used for ``max_age`` seconds are removed, and the
+    oldest are trimmed beyond ``max_entries`` or a total of ``max_size``
+    bytes.  Callers should hold the lock for the cache directory.
+    """
+    now = time.time()
+    entries = [entry for entry in os.scandir(path) if entry.is_dir()]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    total = 0
+    for (ind, entry) in enumerate(entries):
+        if max_size is not None:
+            total += get_dir_size(entry.path)
+        if (
+            ind >= max_entries
+            or now - entry.stat().st_mtime > max_age
+            or (max_size is not None and total > max_size)
+        ):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class SQLiteCache:
+    """Base class for the caches stored in the release helper SQLite database.
+
+    A new connection is used for each operation and the database runs in WAL
+    mode, so it can be shared by threads and by concurrent jobs on a runner.
+    """
+
+    schema = ""
+
+    def __init__(self, path=None):
+        self.path = path or osp.join(get_cache_dir(), "github.sqlite")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.schema)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection and run a single transaction on it"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class PRCache(SQLiteCache):
+    """A SQLite cache of GitHub PR metadata keyed by ``(repo, number)``.
+
+    Entries younger than ``ttl`` are served as-is.  Older entries keep their
+    ETag so they can be revalidated with a conditional request, which does
+    not count against the rate limit.  Entries that have not been read for
+    ``max_age`` are dropped, and the least recently used entries are trimmed
+    beyond ``max_entries``.
+    """
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS prs (
+        repo TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        etag TEXT,
+        data TEXT NOT NULL,
+        fetched REAL NOT NULL,
+        accessed REAL NOT NULL,
+        PRIMARY KEY (repo, number)
+    );
+    CREATE INDEX IF NOT EXISTS prs_accessed ON prs (accessed);
+    """
+
+    def __init__(self, path=None, ttl=None, max_age=None, max_entries=None):
+        super().__init__(path)
+        self.ttl = PR_CACHE_TTL if ttl is None else ttl
+        self.max_age = PR_CACHE_MAX_AGE if max_age is None else max_age
+        self.max_entries = PR_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+
+    def get(self, repo, number):
+        """Get a cached entry, or None if the PR is not cached"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data, etag, fetched FROM prs WHERE repo = ? AND number = ?",
+                (repo, int(number)),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE prs SET accessed = ? WHERE repo = ? AND number = ?",
+                (now, repo, int(number)),
+            )
+        data, etag, fetched = row
+        return CacheEntry(json.loads(data), etag, now - fetched < self.ttl)
+
+    def set(self, repo, number, data, etag=None):
+        """Store the metadata for a PR"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO prs VALUES (?, ?, ?, ?, ?, ?)",
+                (repo, int(number), etag, json.dumps(data), now, now),
+            )
+        self.evict()
+
+    def touch(self, repo, number):
+        """Mark an entry as freshly validated"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE prs SET fetched = ?, accessed = ? WHERE repo = ? AND number = ?",
+                (now, now, repo, int(number)),
+            )
+
+    def evict(self):
+        """Remove stale entries and trim the cache to its maximum size"""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM prs WHERE accessed < ?", (time.time() - self.max_age,)
+            )
+            conn.execute(
+                """
+                DELETE FROM prs WHERE rowid IN (
+                    SELECT rowid FROM prs ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+
+class EntryCache(SQLiteCache):
+    """A SQLite cache of raw changelog entries.
+
+    The key should identify everything the entry depends on, e.g. the repo,
+    branch, previous tag and head commit, so that a matching entry can be
+    reused without contacting GitHub.  Entries expire after ``ttl`` seconds.
+    """
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        entry TEXT NOT NULL,
+        created REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path=None, ttl=None):
+        super().__init__(path)
+        self.ttl = ENTRY_CACHE_TTL if ttl is None else ttl
+
+    def get(self, key):
+        """Get a cached entry, or None if there is no valid entry"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT entry FROM entries WHERE key = ? AND created > ?",
+                (json.dumps(key), time.time() - self.ttl),
+            ).fetchone()
+        return row and row[0]
+
+    def set(self, key, entry):
+        """Store an entry and drop expired ones"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (json.dumps(key), entry, now),
+            )
+            conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+
+
+class LinkCache(SQLiteCache):
+    """A SQLite cache of the links that were found to be valid.
+
+    Only valid links are stored, so broken links are checked on every run.
+    """
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS links (
+        url TEXT PRIMARY KEY,
+        checked REAL NOT NULL
+    );
+    """
+
+    def get_valid(self, max_age):
+        """Get the set of links that were valid within ``max_age`` seconds"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT url FROM links WHERE checked > ?", (time.time() - max_age,)
+            ).fetchall()
+        return set(row[0] for row in rows)
+
+    def set_valid(self, urls):
+        """Record that links are valid and drop links that were not seen lately"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO links VALUES (?, ?)",
+                [(url, now) for url in urls],
+            )
+            conn.execute(
+                "DELETE FROM links WHERE checked < ?", (now - LINK_CACHE_MAX_AGE,)
+            )
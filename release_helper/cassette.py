@@ -0,0 +1,170 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Record and replay of the GitHub API interactions of the release helper.
+
+All GitHub API traffic, whether from our own session, PyGithub or
+github-activity, goes through ``requests.adapters.HTTPAdapter.send``, which is
+wrapped while a cassette is in use.  Other requests, such as the link checks
+of github.com pages, are sent as usual.  Each distinct request is stored as a
+gzipped JSON file in the cassette directory, holding its responses in the order
+they were received.  Authorization headers are never stored.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import os.path as osp
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+from release_helper.cache import file_lock
+
+GITHUB_HOSTS = ("api.github.com",)
+SKIP_HEADERS = ("content-encoding", "content-length", "set-cookie", "transfer-encoding")
+
+# The cassette directory and mode, and the replayed calls to each request
+_cassette = dict(path=None, mode=None, hosts=(), calls=Counter(), send=None)
+_lock = threading.Lock()
+
+
+def get_key(request):
+    """Get the key of a prepared request, from its method, URL and body"""
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    text = f"{request.method} {request.url} {hashlib.sha256(body).hexdigest()}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:20]
+
+
+def load_entry(path):
+    """Load a recorded request and its responses, or None if it is missing"""
+    if not osp.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as fid:
+        return json.load(fid)
+
+
+def dump_response(response):
+    """Convert a response to a JSON serializable dict"""
+    content = response.content or b""
+    data = dict(
+        status=response.status_code,
+        reason=response.reason,
+        headers={
+            name: value
+            for (name, value) in response.headers.items()
+            if name.lower() not in SKIP_HEADERS
+        },
+    )
+    try:
+        data["text"] = content.decode("utf-8")
+    except UnicodeDecodeError:
+        data["base64"] = base64.b64encode(content).decode("ascii")
+    return data
+
+
+def load_response(data, request, adapter):
+    """Build a response for a request from its recorded dict"""
+    from requests import Response
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    response = Response()
+    response.status_code = data["status"]
+    response.reason = data["reason"]
+    response.headers = CaseInsensitiveDict(data["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    if "text" in data:
+        response._content = data["text"].encode("utf-8")
+    else:
+        response._content = base64.b64decode(data["base64"])
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+def send(adapter, request, **kwargs):
+    """Record or replay a request to the GitHub API, others are sent as usual"""
+    if urlparse(request.url).netloc not in _cassette["hosts"]:
+        return _cassette["send"](adapter, request, **kwargs)
+
+    key = get_key(request)
+    path = osp.join(_cassette["path"], f"{key}.json.gz")
+    entry = load_entry(path)
+    responses = entry["responses"] if entry else []
+    with _lock:
+        index = _cassette["calls"][key]
+        _cassette["calls"][key] += 1
+
+    if _cassette["mode"] == "replay":
+        if not responses:
+            raise ValueError(
+                f"No recorded response for {request.method} {request.url} "
+                f"in {_cassette['path']}"
+            )
+        # Repeated requests get the recorded responses in order, then the last
+        data = responses[min(index, len(responses) - 1)]
+        return load_response(data, request, adapter)
+
+    # Responses from an earlier, partial recording are replayed, so that
+    # recording again only sends the requests that are still missing
+    if index < len(responses):
+        return load_response(responses[index], request, adapter)
+
+    response = _cassette["send"](adapter, request, **kwargs)
+    data = dump_response(response)
+    with _lock, file_lock(f"{path}.lock"):
+        entry = load_entry(path) or dict(
+            method=request.method, url=request.url, responses=[]
+        )
+        entry["responses"].append(data)
+        with gzip.open(path, "wt", encoding="utf-8") as fid:
+            json.dump(entry, fid)
+    return response
+
+
+def enable(path, mode):
+    """Record or replay the GitHub API interactions in a cassette directory.
+
+    Parameters
+    ----------
+    path : str
+        The cassette directory
+    mode : str
+        Either "record", to answer requests from the cassette and send the
+        ones it is missing, adding their responses, or "replay", to answer
+        requests from the cassette only
+    """
+    from requests.adapters import HTTPAdapter
+
+    from release_helper.github_client import get_api_url
+
+    if mode not in ("record", "replay"):  # pragma: no cover
+        raise ValueError(f"Invalid cassette mode {mode}")
+    if mode == "replay" and not osp.isdir(path):
+        raise ValueError(f"Missing cassette directory {path}")
+    os.makedirs(path, exist_ok=True)
+
+    disable()
+    _cassette.update(
+        path=osp.abspath(path),
+        mode=mode,
+        hosts=GITHUB_HOSTS + (urlparse(get_api_url()).netloc,),
+        calls=Counter(),
+        send=HTTPAdapter.send,
+    )
+    HTTPAdapter.send = send
+
+
+def disable():
+    """Stop using the cassette, if any"""
+    if _cassette["send"] is None:
+        return
+
+    from requests.adapters import HTTPAdapter
+
+    HTTPAdapter.send = _cassette["send"]
+    _cassette.update(path=None, mode=None, send=None)
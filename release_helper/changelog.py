@@ -0,0 +1,457 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+import re
+from collections import namedtuple
+from datetime import datetime
+from datetime import timezone
+
+START_MARKER = "<!-- <START NEW CHANGELOG ENTRY> -->"
+END_MARKER = "<!-- <END NEW CHANGELOG ENTRY> -->"
+ARCHIVE_MARKER = "<!-- <ARCHIVED CHANGELOG ENTRIES> -->"
+ARCHIVE_INDEX = "index.md"
+PAGE_SIZE = 100
+PR_PATTERN = re.compile(r"\[#(\d+)\]")
+LAST_MERGED_PATTERN = re.compile(r"<!-- <LAST MERGED (\S+)> -->\n?")
+HEADING_PATTERN = re.compile(r"^## +(\S+)")
+LOGIN_PATTERN = re.compile(r"\[@([^\]]+)\]")
+FULL_CHANGELOG_PATTERN = re.compile(r"\[Full Changelog\]\(([^)\s]+)\)", re.IGNORECASE)
+GRAPHS_PATTERN = re.compile(r"/graphs/contributors\?from=([\d-]+)")
+UNTIL_DATE_PATTERN = re.compile(r"[?&]to=(\d{4}-\d{2}-\d{2})")
+INDEX_PATTERN = re.compile(r"^- \[([^\]]+)\]\(([^)#]+)")
+
+PullRequest = namedtuple(
+    "PullRequest",
+    ["number", "title", "url", "author", "merged_at", "merge_commit", "labels"],
+)
+
+MERGED_PRS_QUERY = """
+query($owner: String!, $name: String!, $branch: String, $cursor: String, $first: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(
+      states: MERGED
+      baseRefName: $branch
+      first: $first
+      after: $cursor
+      orderBy: {field: UPDATED_AT, direction: DESC}
+    ) {
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+      nodes {
+        number
+        title
+        url
+        mergedAt
+        updatedAt
+        author {
+          login
+        }
+        mergeCommit {
+          oid
+        }
+        labels(first: 10) {
+          nodes {
+            name
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def format_timestamp(dt):
+    """Format a datetime as a GitHub style UTC timestamp"""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_timestamp(value):
+    """Parse a GitHub style UTC timestamp"""
+    dt = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def format_last_merged(dt):
+    """Format the marker that records when an entry was last updated"""
+    return f"<!-- <LAST MERGED {format_timestamp(dt)}> -->"
+
+
+def get_last_merged(text):
+    """Get the time an entry was last updated from its marker, if any"""
+    match = LAST_MERGED_PATTERN.search(text)
+    if match:
+        return parse_timestamp(match.groups()[0])
+
+
+def strip_last_merged(text):
+    """Remove the last update marker from an entry"""
+    return LAST_MERGED_PATTERN.sub("", text)
+
+
+class ChangelogEntry:
+    """A changelog entry, parsed once into an index of its contents.
+
+    Parameters
+    ----------
+    text : str
+        The entry, starting at its ``## <version>`` heading.  Insert markers
+        and the last update marker are left out of the parsed entry
+
+    Attributes
+    ----------
+    text : str
+        The entry, without markers
+    version : str
+        The version in the heading, or None
+    prs : dict
+        A mapping of PR number to the line that lists it
+    contributors : list of str
+        The logins in the contributors section
+    full_changelog : str
+        The URL of the full changelog comparison, or None
+    date : date
+        The end date of the contributors section, or None
+    last_merged : datetime
+        The time the entry was last updated, or None
+    """
+
+    def __init__(self, text):
+        self.last_merged = get_last_merged(text)
+        text = strip_last_merged(text)
+        for marker in (START_MARKER, END_MARKER):
+            text = text.replace(marker, "")
+        self.text = text.strip()
+
+        self.version = None
+        self.prs = dict()
+        self.contributors = []
+        self.full_changelog = None
+        self.date = None
+        in_contributors = False
+        for line in self.text.splitlines():
+            heading = HEADING_PATTERN.match(line)
+            if heading:
+                self.version = self.version or heading.groups()[0]
+            elif line.startswith("### Contributors"):
+                in_contributors = True
+            elif in_contributors:
+                self.contributors.extend(LOGIN_PATTERN.findall(line))
+                until = UNTIL_DATE_PATTERN.search(line)
+                if until and not self.date:
+                    self.date = datetime.strptime(until.groups()[0], "%Y-%m-%d").date()
+            else:
+                link = FULL_CHANGELOG_PATTERN.search(line)
+                if link and not self.full_changelog:
+                    self.full_changelog = link.groups()[0]
+                for number in PR_PATTERN.findall(line):
+                    self.prs[int(number)] = line
+
+
+class Changelog:
+    """A parsed changelog, with its entries by version and an index of PRs.
+
+    Parameters
+    ----------
+    text : str
+        The changelog text
+
+    Attributes
+    ----------
+    entries : dict
+        A mapping of version to :class:`ChangelogEntry`, in the order of
+        the file
+    new_entry : ChangelogEntry
+        The entry between the insert markers, or None
+    prs : dict
+        A mapping of PR number to the most recent entry that lists it
+    """
+
+    def __init__(self, text):
+        self.entries = dict()
+        self.new_entry = None
+        self.prs = dict()
+
+        blocks = []
+        pending = False
+        for line in text.splitlines():
+            if line.strip() in (START_MARKER, END_MARKER):
+                pending = line.strip() == START_MARKER
+                blocks.append((pending, []))
+            elif line.strip() == ARCHIVE_MARKER:
+                # The link to the archive is not part of the last entry
+                blocks.append((pending, []))
+            elif HEADING_PATTERN.match(line):
+                blocks.append((pending, [line]))
+            elif blocks:
+                blocks[-1][1].append(line)
+
+        for pending, lines in blocks:
+            entry = ChangelogEntry("\n".join(lines))
+            if entry.version is None:
+                continue
+            if pending and self.new_entry is None:
+                self.new_entry = entry
+            self.entries.setdefault(entry.version, entry)
+            for number in entry.prs:
+                self.prs.setdefault(number, entry)
+
+
+def get_anchor(heading):
+    """Get the GitHub anchor of a Markdown heading"""
+    anchor = re.sub(r"[^\w\- ]", "", heading.strip().lower())
+    return anchor.replace(" ", "-")
+
+
+def parse_archive_index(text):
+    """Parse a changelog archive index into a mapping of version to file name"""
+    index = dict()
+    for line in text.splitlines():
+        match = INDEX_PATTERN.match(line)
+        if match:
+            index[match.groups()[0]] = match.groups()[1]
+    return index
+
+
+def format_archive_index(index):
+    """Format a changelog archive index from a mapping of version to file name"""
+    lines = [
+        "# Changelog Archive",
+        "",
+        "<!-- Generated by release-helper archive-changelog -->",
+        "",
+    ]
+    for version, name in index.items():
+        lines.append(f"- [{version}]({name}#{get_anchor(version)})")
+    return "\n".join(lines) + "\n"
+
+
+def merge_entries(new_entry, old_entry):
+    """Merge a regenerated entry with an existing one.
+
+    Lines for PRs that are already in the old entry are kept as they are,
+    since they may have been edited by hand.
+
+    Parameters
+    ----------
+    new_entry : str
+        The regenerated entry
+    old_entry : ChangelogEntry
+        The existing entry
+
+    Returns
+    -------
+    str
+        The merged entry
+    """
+    lines = new_entry.splitlines()
+    for ind, line in enumerate(lines):
+        match = PR_PATTERN.search(line)
+        if match and int(match.groups()[0]) in old_entry.prs:
+            lines[ind] = old_entry.prs[int(match.groups()[0])]
+    return "\n".join(lines)
+
+
+def iter_merged_prs(repo, since, until=None, branch=None, auth=None):
+    """Yield the PRs merged in a time window, one page at a time.
+
+    PRs are requested most recently updated first, so paging stops as soon
+    as a page reaches PRs that were last updated before ``since``.
+
+    Parameters
+    ----------
+    repo : str
+        The GitHub organization/repo
+    since : datetime
+        Only include PRs merged after this time
+    until : datetime, optional
+        Only include PRs merged before this time (defaults to now)
+    branch : str, optional
+        Only include PRs merged into this base branch
+    auth : str, optional
+        The GitHub authorization token
+
+    Yields
+    ------
+    PullRequest
+        The merged PRs
+    """
+    from release_helper.github_client import github_graphql
+
+    owner, name = repo.split("/")
+    since_str = format_timestamp(since)
+    until_str = format_timestamp(until or datetime.now(timezone.utc))
+    cursor = None
+
+    while True:
+        data = github_graphql(
+            MERGED_PRS_QUERY,
+            auth=auth,
+            owner=owner,
+            name=name,
+            branch=branch,
+            cursor=cursor,
+            first=PAGE_SIZE,
+        )
+        page = data["repository"]["pullRequests"]
+        done = not page["pageInfo"]["hasNextPage"]
+
+        for node in page["nodes"]:
+            if node["updatedAt"] < since_str:
+                done = True
+                continue
+            if not since_str < node["mergedAt"] <= until_str:
+                continue
+            author = (node["author"] or dict(login="ghost"))["login"]
+            yield PullRequest(
+                number=node["number"],
+                title=node["title"],
+                url=node["url"],
+                author=author,
+                merged_at=node["mergedAt"],
+                merge_commit=(node["mergeCommit"] or dict(oid=""))["oid"],
+                labels=[label["name"] for label in node["labels"]["nodes"]],
+            )
+
+        if done:
+            break
+        cursor = page["pageInfo"]["endCursor"]
+
+
+def format_pr(pr):
+    """Format a PR record as a changelog line"""
+    author = f"[@{pr.author}](https://github.com/{pr.author})"
+    return f"- {pr.title} [#{pr.number}]({pr.url}) ({author})"
+
+
+def iter_changelog_md(repo, prs, since, until_ref, since_dt, until_dt=None):
+    """Render the body of a changelog entry incrementally.
+
+    Only the contributor names are held in memory; PR lines are yielded as
+    the records arrive.  Nothing is yielded if there are no PRs.
+
+    Parameters
+    ----------
+    repo : str
+        The GitHub organization/repo
+    prs : iterable of PullRequest
+        The merged PRs
+    since : str
+        The git reference of the previous release
+    until_ref : str
+        The git reference of the new release
+    since_dt : datetime
+        The time of the previous release
+    until_dt : datetime, optional
+        The time of the new release (defaults to now)
+
+    Yields
+    ------
+    str
+        The lines of the changelog entry body
+    """
+    until_dt = until_dt or datetime.now(timezone.utc)
+    contributors = set()
+
+    for pr in prs:
+        if not contributors:
+            yield f"([Full Changelog](https://github.com/{repo}/compare/{since}...{until_ref}))"
+            yield ""
+        contributors.add(pr.author)
+        yield format_pr(pr)
+
+    if not contributors:
+        return
+
+    yield ""
+    yield from format_contributors(repo, contributors, since_dt, until_dt)
+
+
+def format_contributors(repo, logins, since_dt, until_dt):
+    """Format the contributors section of a changelog entry as a list of lines"""
+    owner, name = repo.split("/")
+    start = f"{since_dt:%Y-%m-%d}"
+    stop = f"{until_dt:%Y-%m-%d}"
+    graphs = (
+        f"https://github.com/{repo}/graphs/contributors?from={start}&to={stop}&type=c"
+    )
+    links = []
+    for login in sorted(logins, key=str.lower):
+        search = f"https://github.com/search?q=repo%3A{owner}%2F{name}+involves%3A{login}+updated%3A{start}..{stop}&type=Issues"
+        links.append(f"[@{login}]({search})")
+
+    return [
+        "### Contributors to this release",
+        "",
+        f"([GitHub contributors page for this release]({graphs}))",
+        "",
+        " | ".join(links),
+    ]
+
+
+def update_entry(entry, repo, prs, until_ref, until_dt):
+    """Add newly merged PRs to an existing changelog entry.
+
+    PRs that are already in the entry are skipped using a PR number index.
+    The full changelog link and contributors section are brought up to date.
+
+    Parameters
+    ----------
+    entry : str
+        The existing changelog entry
+    repo : str
+        The GitHub organization/repo
+    prs : iterable of PullRequest
+        The PRs merged since the entry was last updated
+    until_ref : str
+        The git reference of the new release
+    until_dt : datetime
+        The time of the update
+
+    Returns
+    -------
+    str
+        The updated entry, or None if the entry has no PR list to update
+    """
+    lines = entry.splitlines()
+    prs_start = None
+    contributors = None
+    graphs = None
+    logins_line = None
+    for ind, line in enumerate(lines):
+        if contributors is None:
+            if prs_start is None and line.startswith("- ") and PR_PATTERN.search(line):
+                prs_start = ind
+            elif line.startswith("### Contributors"):
+                contributors = ind
+        elif graphs is None and GRAPHS_PATTERN.search(line):
+            graphs = ind
+        elif graphs is not None and LOGIN_PATTERN.search(line):
+            logins_line = ind
+            break
+
+    # The section may have been edited by hand, regenerate it if unsure
+    if prs_start is None or logins_line is None:
+        return None
+    start = GRAPHS_PATTERN.search(lines[graphs])
+
+    index = ChangelogEntry(entry).prs
+    new_prs = [pr for pr in prs if pr.number not in index]
+
+    # Update the contributors, keeping the original start date
+    since_dt = datetime.strptime(start.groups()[0], "%Y-%m-%d")
+    logins = set(LOGIN_PATTERN.findall(lines[logins_line]))
+    logins.update(pr.author for pr in new_prs)
+    lines[contributors : logins_line + 1] = format_contributors(
+        repo, logins, since_dt, until_dt
+    )
+
+    # Add the new PRs at the top of the list, most recent first
+    lines[prs_start:prs_start] = [format_pr(pr) for pr in new_prs]
+
+    # Point the full changelog at the new head
+    entry = "\n".join(lines)
+    return re.sub(
+        r"(/compare/.+?\.\.\.)[^)\s]+\)", rf"\g<1>{until_ref})", entry, count=1
+    )
@@ -1,32 +1,77 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
+import ast
 import hashlib
+import io
 import json
+import mmap
 import os
 import os.path as osp
 import re
 import shlex
 import shutil
 import sys
-import tarfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from contextlib import redirect_stdout
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from fnmatch import fnmatch
+from functools import partial
 from glob import glob
+from multiprocessing import get_context
 from pathlib import Path
 from subprocess import CalledProcessError
 from subprocess import check_output
+from subprocess import PIPE
+from subprocess import Popen
+from subprocess import STDOUT
+from tempfile import mkstemp
 from tempfile import TemporaryDirectory
 
 import click
-import requests
-from github import Github
-from github_activity import generate_activity_md
+from packaging.version import InvalidVersion
+from packaging.version import Version
 
 from release_helper import __version__
+from release_helper import cache
+from release_helper import cassette
+from release_helper import tracing
+from release_helper.cache import EntryCache
+from release_helper.cache import evict_dirs
+from release_helper.cache import file_lock
+from release_helper.cache import get_cache_dir
+from release_helper.changelog import ARCHIVE_INDEX
+from release_helper.changelog import ARCHIVE_MARKER
+from release_helper.changelog import Changelog
+from release_helper.changelog import ChangelogEntry
+from release_helper.changelog import END_MARKER
+from release_helper.changelog import format_archive_index
+from release_helper.changelog import format_last_merged
+from release_helper.changelog import format_timestamp
+from release_helper.changelog import iter_changelog_md
+from release_helper.changelog import iter_merged_prs
+from release_helper.changelog import merge_entries
+from release_helper.changelog import parse_archive_index
+from release_helper.changelog import START_MARKER
+from release_helper.changelog import strip_last_merged
+from release_helper.changelog import update_entry
 
 HERE = osp.abspath(osp.dirname(__file__))
-START_MARKER = "<!-- <START NEW CHANGELOG ENTRY> -->"
-END_MARKER = "<!-- <END NEW CHANGELOG ENTRY> -->"
-BUF_SIZE = 65536
+BUF_SIZE = 1 << 20
+RUN_TAIL_LINES = 100
 TBUMP_CMD = "tbump --non-interactive --only-patch"
+BACKPORT_WORKERS = 8
+VERSION_FILES = ["setup.py", "setup.cfg", "pyproject.toml", "package.json"]
+
+# Statically resolved versions by working directory, with the file stats
+# they were resolved from
+_version_cache = dict()
 
 
 # """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
@@ -35,15 +80,62 @@ TBUMP_CMD = "tbump --non-interactive --only-patch"
 
 
 def run(cmd, **kwargs):
-    """Run a command as a subprocess and get the output as a string"""
-    if not kwargs.pop("quiet", False):
+    """Run a command as a subprocess and get the output as a string.
+
+    The output is forwarded line by line as it arrives, and only the last
+    ``RUN_TAIL_LINES`` lines are kept to be returned and reported on failure.
+    Commands run with ``quiet=True`` are not echoed, and their full output is
+    captured and returned instead.
+    """
+    quiet = kwargs.pop("quiet", False)
+    if not quiet:
         print(f"+ {cmd}")
 
-    try:
-        return check_output(shlex.split(cmd), **kwargs).decode("utf-8").strip()
-    except CalledProcessError as e:
-        print(e.output.decode("utf-8").strip())
-        raise e
+    with tracing.span(cmd, "subprocess") as info:
+        try:
+            if quiet:
+                output = check_output(shlex.split(cmd), **kwargs)
+                size = len(output)
+            else:
+                output, size = stream_output(shlex.split(cmd), **kwargs)
+        except CalledProcessError as e:
+            info.update(returncode=e.returncode, output_bytes=len(e.output or b""))
+            if quiet:
+                print(e.output.decode("utf-8").strip())
+            raise e
+        info.update(returncode=0, output_bytes=size)
+
+    return output.decode("utf-8").strip()
+
+
+def stream_output(args, **kwargs):
+    """Run a command and print its output line by line as it arrives.
+
+    Parameters
+    ----------
+    args : list of str
+        The command arguments
+    **kwargs
+        Keyword arguments passed to ``subprocess.Popen``
+
+    Returns
+    -------
+    tuple
+        The last ``RUN_TAIL_LINES`` lines of output as bytes, and the total
+        size of the output
+    """
+    tail = deque(maxlen=RUN_TAIL_LINES)
+    size = 0
+    with Popen(args, stdout=PIPE, **kwargs) as proc:
+        for line in proc.stdout:
+            size += len(line)
+            tail.append(line)
+            print(line.decode("utf-8", "replace").rstrip("\r\n"), flush=True)
+
+    output = b"".join(tail)
+    if proc.returncode:
+        raise CalledProcessError(proc.returncode, args, output=output)
+    return output, size
 
 
 def get_branch():
@@ -66,7 +158,7 @@ def get_repo(remote, auth=None):
     if gh_repo:
         return get_source_repo(gh_repo, auth=auth)
 
-    url = run(f"git remote get-url {remote}")
+    url = run(f"git remote get-url {remote}", quiet=True)
     url = normalize_path(url)
     parts = url.split("/")[-2:]
     if ":" in parts[0]:
@@ -76,6 +168,20 @@ def get_repo(remote, auth=None):
 
 def get_version():
     """Get the current package version"""
+    cwd = os.getcwd()
+    if cwd in _version_cache:
+        version, stats = _version_cache[cwd]
+        if all(get_file_stat(path) == stat for (path, stat) in stats.items()):
+            return version
+
+    paths = [path for path in VERSION_FILES if osp.exists(path)]
+    version = get_static_version(paths)
+    if version is not None:
+        paths = set(VERSION_FILES + paths)
+        _version_cache[cwd] = (version, {path: get_file_stat(path) for path in paths})
+        return version
+
+    # Fall back on running the setup script, or on the npm package version
     if osp.exists("setup.py"):
         return run("python setup.py --version", quiet=True)
     elif osp.exists("package.json"):
@@ -84,6 +190,135 @@ def get_version():
         raise ValueError("No version identifier could be found!")
 
 
+def get_file_stat(path):
+    """Get the modification time and size of a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_static_version(paths):
+    """Resolve the package version from the metadata files, without running code.
+
+    Parameters
+    ----------
+    paths : list of str
+        The metadata files that exist, any files read to find the version
+        are appended to it
+
+    Returns
+    -------
+    str
+        The version, or None if it cannot be resolved statically
+    """
+    pyproject = dict()
+    if "pyproject.toml" in paths:
+        pyproject = load_toml("pyproject.toml") or dict()
+    project = pyproject.get("project", dict())
+    setuptools_config = pyproject.get("tool", dict()).get("setuptools", dict())
+
+    config = ConfigParser()
+    if "setup.cfg" in paths:
+        config.read("setup.cfg", encoding="utf-8")
+
+    if "setup.py" not in paths and not project:
+        if "package.json" in paths:
+            data = json.loads(Path("package.json").read_text(encoding="utf-8"))
+            return data["version"]
+        return None
+
+    # PEP 621 metadata
+    if "version" in project:
+        return project["version"]
+
+    spec = None
+    if "version" in project.get("dynamic", []):
+        spec = setuptools_config.get("dynamic", dict()).get("version")
+    if not spec and config.has_option("metadata", "version"):
+        spec = config.get("metadata", "version").strip()
+    if not spec:
+        return None
+
+    if isinstance(spec, dict):
+        if "attr" in spec:
+            spec = f"attr: {spec['attr']}"
+        else:
+            spec = f"file: {spec['file']}"
+
+    if spec.startswith("file:"):
+        path = spec[len("file:") :].strip()
+        paths.append(path)
+        return Path(path).read_text(encoding="utf-8").strip()
+
+    if not spec.startswith("attr:"):
+        return spec
+
+    # Find the module that holds the attribute
+    module, _, attr = spec[len("attr:") :].strip().rpartition(".")
+    root = setuptools_config.get("package-dir", dict()).get("", "")
+    if config.has_option("options", "package_dir"):
+        for line in config.get("options", "package_dir").splitlines():
+            name, _, value = line.partition("=")
+            if value and not name.strip():
+                root = value.strip()
+
+    module_path = osp.join(root, *module.split("."))
+    for path in [osp.join(module_path, "__init__.py"), module_path + ".py"]:
+        if osp.exists(path):
+            paths.append(path)
+            return get_module_attr(path, attr)
+
+    return None
+
+
+def get_module_attr(path, attr):
+    """Get a literal module level assignment from a Python file, or None"""
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign):
+            targets = [node.target]
+        else:
+            continue
+        if any(
+            isinstance(target, ast.Name) and target.id == attr for target in targets
+        ):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            return value if isinstance(value, str) else None
+    return None
+
+
+def parse_toml(text):
+    """Parse TOML text, or return None if no TOML parser is available"""
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            return None
+
+    return tomllib.loads(text)
+
+
+def load_toml(path):
+    """Load a TOML file, or return None if no TOML parser is available"""
+    return parse_toml(Path(path).read_text(encoding="utf-8"))
+
+
+def generate_activity_md(*args, **kwargs):
+    """Generate a changelog with github_activity, which is imported on first use"""
+    from github_activity import generate_activity_md
+
+    return generate_activity_md(*args, **kwargs)
+
+
 def normalize_path(path):
     """Normalize a path to use backslashes"""
     return str(path).replace(os.sep, "/")
@@ -106,12 +341,10 @@ def format_pr_entry(target, number, auth=None):
     str
         A formatted PR entry
     """
+    from release_helper.github_client import get_pr_data
+
     api_token = auth or os.environ["GITHUB_ACCESS_TOKEN"]
-    headers = {"Authorization": "token %s" % api_token}
-    r = requests.get(
-        f"https://api.github.com/repos/{target}/pulls/{number}", headers=headers
-    )
-    data = r.json()
+    data = get_pr_data(target, number, auth=api_token)
     title = data["title"]
     number = data["number"]
     url = data["url"]
@@ -120,6 +353,37 @@ def format_pr_entry(target, number, auth=None):
     return f"- {title} [{number}]({url}) [@{user_name}]({user_url})"
 
 
+def format_pr_entries(target, numbers, auth=None, max_workers=BACKPORT_WORKERS):
+    """Format several PR entries concurrently.
+
+    Parameters
+    ----------
+    target : str
+        The GitHub organization/repo
+    numbers : iterable of int
+        The PR numbers to resolve
+    auth : str, optional
+        The GitHub authorization token
+    max_workers : int, optional
+        The maximum number of concurrent requests
+
+    Returns
+    -------
+    dict
+        A mapping of PR number to formatted PR entry
+    """
+    numbers = list(dict.fromkeys(numbers))
+    if not numbers:
+        return dict()
+
+    max_workers = min(max_workers, len(numbers))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        entries = executor.map(
+            lambda number: format_pr_entry(target, number, auth=auth), numbers
+        )
+        return dict(zip(numbers, entries))
+
+
 def get_source_repo(target, auth=None):
     """Get the source repo for a given repo.
 
@@ -135,17 +399,76 @@ def get_source_repo(target, auth=None):
     str
         A formatted PR entry
     """
+    from release_helper.github_client import github_api
+
     api_token = auth or os.environ.get("GITHUB_ACCESS_TOKEN")
-    headers = {"Authorization": "token %s" % api_token}
-    r = requests.get(f"https://api.github.com/repos/{target}", headers=headers)
-    data = r.json()
+    data = github_api(f"repos/{target}", auth=api_token).json()
     # If this is the source repo, return the original target
     if "source" not in data:
         return target
     return data["source"]["full_name"]
 
 
-def get_changelog_entry(branch, repo, version, *, auth=None, resolve_backports=False):
+def parse_tag_version(tag):
+    """Parse a release tag such as ``v1.2.3`` as a version, or return None"""
+    try:
+        return Version(tag[1:] if tag.startswith("v") else tag)
+    except InvalidVersion:
+        return None
+
+
+def get_previous_tag(branch):
+    """Get the tag of the latest release that is reachable from a branch.
+
+    Tags are compared as versions, so that e.g. v1.10 comes after v1.9.
+    If none of the tags are versions, the nearest tag is used instead.
+    """
+    tags = run(f"git tag --merged {branch}", quiet=True).splitlines()
+    if not tags:  # pragma: no cover
+        raise ValueError(f"No tags found on branch {branch}")
+
+    versions = dict()
+    for tag in tags:
+        version = parse_tag_version(tag)
+        if version is not None:
+            versions[tag] = version
+
+    if not versions:
+        return run(f"git describe --tags --abbrev=0 {branch}", quiet=True)
+
+    return max(versions, key=versions.get)
+
+
+def resolve_backport_entries(repo, lines, auth=None):
+    """Replace backport PR entries with their original PRs.
+
+    All of the backports are gathered first so they can be resolved in one
+    batch, then spliced back in at their original positions.
+    """
+    lines = list(lines)
+    backports = dict()
+    for (ind, line) in enumerate(lines):
+        if re.search(r"\[@meeseeksmachine\]", line) is not None:
+            match = re.search(r"Backport PR #(\d+)", line)
+            if match:
+                backports[ind] = match.groups()[0]
+
+    entries = format_pr_entries(repo, backports.values(), auth=auth)
+    for (ind, number) in backports.items():
+        lines[ind] = entries[number]
+    return lines
+
+
+def get_changelog_entry(
+    branch,
+    repo,
+    version,
+    *,
+    auth=None,
+    resolve_backports=False,
+    engine="github-activity",
+    cache=False,
+):
     """Get a changelog for the changes since the last tag on the given branch.
 
     Parameters
@@ -160,54 +483,84 @@ def get_changelog_entry(branch, repo, version, *, auth=None, resolve_backports=F
         The GitHub authorization token
     resolve_backports: bool, optional
         Whether to resolve backports to the original PR
+    engine: str, optional
+        The changelog backend, either "github-activity" or "graphql"
+    cache: bool, optional
+        Whether to reuse an entry fetched for the same repo, branch,
+        previous tag and head commit
 
     Returns
     -------
     str
         A formatted changelog entry with markers
     """
-    since = run(f"git tag --merged {branch}")
-    if not since:  # pragma: no cover
-        raise ValueError(f"No tags found on branch {branch}")
+    since = get_previous_tag(branch)
 
-    since = since.splitlines()[-1]
-    print(f"Getting changes to {repo} since {since}...")
+    if not cache:
+        return build_changelog_entry(
+            branch, repo, version, since, auth, resolve_backports, engine
+        )
 
-    md = generate_activity_md(repo, since=since, kind="pr", auth=auth)
+    # The version heading is not part of the key, it is added back below
+    head = run(f"git rev-parse {branch}", quiet=True)
+    key = [repo, branch, since, head, engine, resolve_backports]
+    entries = EntryCache()
+    body = entries.get(key)
+    if body is None:
+        entry = build_changelog_entry(
+            branch, repo, version, since, auth, resolve_backports, engine
+        )
+        body = entry.split("\n", 1)[1]
+        entries.set(key, body)
+    else:
+        print(f"Using the cached changes to {repo} since {since} at {head}")
 
-    if not md:
-        print("No PRs found")
-        return f"## {version}\nNo merged PRs"
+    return f"## {version}\n{body}"
 
-    md = md.splitlines()
 
-    start = -1
-    full_changelog = ""
-    for (ind, line) in enumerate(md):
-        if "[full changelog]" in line:
-            full_changelog = line.replace("full changelog", "Full Changelog")
-        elif line.strip().startswith("## Merged PRs"):
-            start = ind + 1
+def build_changelog_entry(
+    branch, repo, version, since, auth, resolve_backports, engine
+):
+    """Fetch and format the changelog entry for the changes since a tag"""
+    print(f"Getting changes to {repo} since {since}...")
 
-    prs = md[start:]
+    if engine == "graphql":
+        md = iter_graphql_changelog_md(branch, repo, since, auth=auth)
+        full_changelog = next(md, None)
+        if full_changelog is None:
+            print("No PRs found")
+            return f"## {version}\nNo merged PRs"
+        # Skip the blank line, the PR lines are joined straight from the stream
+        next(md)
+        prs = md
+    else:
+        md = generate_activity_md(repo, since=since, kind="pr", auth=auth)
+        md = md.splitlines() if md else []
+        if not md:
+            print("No PRs found")
+            return f"## {version}\nNo merged PRs"
+
+        start = -1
+        full_changelog = ""
+        for (ind, line) in enumerate(md):
+            if "[full changelog]" in line:
+                full_changelog = line.replace("full changelog", "Full Changelog")
+            elif line.strip().startswith("## Merged PRs"):
+                start = ind + 1
+
+        prs = []
+        for line in md[start:]:
+            # Move the contributor list to a heading level 3
+            line = line.replace("## Contributors", "### Contributors")
+            # Replace "*" unordered list marker with "-" since this is what
+            # Prettier uses
+            prs.append(re.sub(r"^\* ", "- ", line))
 
     if resolve_backports:
-        for (ind, line) in enumerate(prs):
-            if re.search(r"\[@meeseeksmachine\]", line) is not None:
-                match = re.search(r"Backport PR #(\d+)", line)
-                if match:
-                    prs[ind] = format_pr_entry(match.groups()[0])
+        prs = resolve_backport_entries(repo, prs, auth=auth)
 
     prs = "\n".join(prs).strip()
 
-    # Move the contributor list to a heading level 3
-    prs = prs.replace("## Contributors", "### Contributors")
-
-    # Replace "*" unordered list marker with "-" since this is what
-    # Prettier uses
-    prs = re.sub(r"^\* ", "- ", prs)
-    prs = re.sub(r"\n\* ", "\n- ", prs)
-
     output = f"""
 ## {version}
 
@@ -219,52 +572,693 @@ def get_changelog_entry(branch, repo, version, *, auth=None, resolve_backports=F
     return output
 
 
-def compute_sha256(path):
-    """Compute the sha256 of a file"""
-    sha256 = hashlib.sha256()
+def get_base_branch(branch):
+    """Get the branch name of a git reference, without the remote prefix"""
+    remotes = run("git remote", quiet=True).splitlines()
+    if "/" in branch and branch.split("/")[0] in remotes:
+        return branch.split("/", 1)[1]
+    return branch
+
+
+def iter_graphql_changelog_md(branch, repo, since, auth=None):
+    """Stream the lines of a changelog entry body using the GraphQL engine"""
+    since_dt = int(run(f"git log -1 --format=%ct {since}", quiet=True))
+    since_dt = datetime.fromtimestamp(since_dt, timezone.utc)
+    until_ref = run(f"git rev-parse {branch}", quiet=True)
 
-    with open(path, "rb") as f:
+    prs = iter_merged_prs(repo, since_dt, branch=get_base_branch(branch), auth=auth)
+    return iter_changelog_md(repo, prs, since, until_ref, since_dt)
+
+
+def update_changelog_entry(
+    entry, branch, repo, last_merged, *, auth=None, resolve_backports=False
+):
+    """Add the PRs merged since the last update to an existing changelog entry.
+
+    Parameters
+    ----------
+    entry : str
+        The existing changelog entry, without markers
+    branch : str
+        The target branch
+    repo : str
+        The GitHub organization/repo
+    last_merged : datetime
+        The time the entry was last updated
+    auth : str, optional
+        The GitHub authorization token
+    resolve_backports: bool, optional
+        Whether to resolve backports to the original PR
+
+    Returns
+    -------
+    str
+        The updated entry, or None if it must be regenerated
+    """
+    print(f"Getting changes to {repo} since {format_timestamp(last_merged)}...")
+    until_ref = run(f"git rev-parse {branch}", quiet=True)
+    prs = iter_merged_prs(repo, last_merged, branch=get_base_branch(branch), auth=auth)
+    entry = update_entry(entry, repo, prs, until_ref, datetime.now(timezone.utc))
+    if entry is None:
+        return None
+
+    if resolve_backports:
+        entry = "\n".join(resolve_backport_entries(repo, entry.splitlines(), auth))
+
+    return entry
+
+
+def find_changelog_markers(path):
+    """Find the new entry markers in a changelog in one pass over the file.
+
+    Returns
+    -------
+    tuple
+        The byte offsets of the start marker and the end marker
+    """
+    start_marker = START_MARKER.encode("utf-8")
+    end_marker = END_MARKER.encode("utf-8")
+    with open(path, "rb") as fid:
+        if not os.fstat(fid.fileno()).st_size:
+            raise ValueError("Missing insert marker for changelog")
+        with mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = mm.find(start_marker)
+            end = -1 if start == -1 else mm.find(end_marker, start)
+            if end == -1:
+                raise ValueError("Missing insert marker for changelog")
+            if mm.find(start_marker, start + len(start_marker)) != -1:
+                raise ValueError("Insert marker appears more than once in changelog")
+    return start, end
+
+
+def read_file_range(path, begin, stop):
+    """Read the bytes of a file between two offsets"""
+    with open(path, "rb") as fid:
+        fid.seek(begin)
+        return fid.read(stop - begin)
+
+
+def read_changelog_entry(path):
+    """Parse the entry between the insert markers of a changelog"""
+    start, end = find_changelog_markers(path)
+    text = read_file_range(path, start, end + len(END_MARKER))
+    return ChangelogEntry(text.decode("utf-8"))
+
+
+def splice_file(path, edits):
+    """Replace ranges of a file, streaming the rest of it to the new file.
+
+    The new file is written next to the original and renamed over it, so the
+    file is never left partially written.
+
+    Parameters
+    ----------
+    path : str
+        The file to update
+    edits : list of tuple
+        The ``(begin, stop, text)`` of each range to replace, in order of
+        position and not overlapping
+    """
+    fd, temp_path = mkstemp(dir=osp.dirname(osp.abspath(path)), suffix=".tmp")
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            for (begin, stop, text) in edits:
+                remaining = begin - src.tell()
+                while remaining:
+                    chunk = src.read(min(remaining, BUF_SIZE))
+                    dst.write(chunk)
+                    remaining -= len(chunk)
+                dst.write(text.encode("utf-8"))
+                src.seek(stop)
+            shutil.copyfileobj(src, dst, BUF_SIZE)
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if osp.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def get_tag_dates():
+    """Get the creation date of each tag, keyed by version"""
+    cmd = 'git for-each-ref --format="%(refname:short) %(creatordate:short)" refs/tags'
+    try:
+        output = run(cmd, quiet=True)
+    except CalledProcessError:  # pragma: no cover
+        return dict()
+
+    dates = dict()
+    for line in output.splitlines():
+        tag, _, value = line.partition(" ")
+        version = tag[1:] if tag.startswith("v") else tag
+        dates[version] = datetime.strptime(value, "%Y-%m-%d").date()
+    return dates
+
+
+def get_archive_name(version, group_by, entry_date):
+    """Get the archive file name and title for a changelog entry.
+
+    Entries are grouped by major version, or by year when ``group_by`` is
+    "year".  Entries that cannot be grouped go to a shared file.
+    """
+    label = None
+    if group_by == "year":
+        label = entry_date and str(entry_date.year)
+    else:
+        parsed = parse_tag_version(version)
+        label = parsed is not None and f"{parsed.major}.x"
+    if not label:
+        return "CHANGELOG-other.md", "Changelog"
+    return f"CHANGELOG-{label}.md", f"Changelog {label}"
+
+
+def add_archive_entries(path, title, entries):
+    """Add entries to the top of a changelog archive file.
+
+    Versions that are already in the archive are skipped, so that an
+    interrupted archive run can be repeated.
+    """
+    if not osp.exists(path):
+        texts = [entry.text for entry in entries]
+        text = f"# {title}\n\n" + "\n\n".join(texts) + "\n"
+        Path(path).write_text(text, encoding="utf-8")
+        return
+
+    text = Path(path).read_bytes().decode("utf-8")
+    existing = Changelog(text).entries
+    texts = [entry.text for entry in entries if entry.version not in existing]
+    if not texts:
+        return
+
+    match = re.search(r"^## ", text, re.MULTILINE)
+    offset = len(text[: match.start()].encode("utf-8"))
+    splice_file(path, [(offset, offset, "\n\n".join(texts) + "\n\n")])
+
+
+def find_changelog_entry(path, version, archive_dir):
+    """Find the entry for a version in a changelog or in its archive.
+
+    Returns
+    -------
+    ChangelogEntry
+        The entry, or None if it cannot be found
+    """
+    entry = Changelog(Path(path).read_text(encoding="utf-8")).entries.get(version)
+    index_path = osp.join(archive_dir, ARCHIVE_INDEX)
+    if entry or not osp.exists(index_path):
+        return entry
+
+    index = parse_archive_index(Path(index_path).read_text(encoding="utf-8"))
+    if version not in index:
+        return None
+    text = Path(archive_dir, index[version]).read_text(encoding="utf-8")
+    return Changelog(text).entries.get(version)
+
+
+def compute_digests(path, algorithms=("sha256",)):
+    """Compute one or more digests of a file in a single read pass.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file
+    algorithms : sequence of str, optional
+        The hashlib algorithm names to compute
+
+    Returns
+    -------
+    dict
+        A mapping of algorithm name to hex digest
+    """
+    hashers = [hashlib.new(name) for name in algorithms]
+    buf = bytearray(BUF_SIZE)
+    view = memoryview(buf)
+
+    with open(path, "rb", buffering=0) as f:
         while True:
-            data = f.read(BUF_SIZE)
-            if not data:
+            size = f.readinto(buf)
+            if not size:
                 break
-            sha256.update(data)
+            for hasher in hashers:
+                hasher.update(view[:size])
+
+    return {name: hasher.hexdigest() for (name, hasher) in zip(algorithms, hashers)}
 
-    return sha256.hexdigest()
+
+def compute_sha256(path):
+    """Compute the sha256 of a file"""
+    return compute_digests(path)["sha256"]
 
 
-def create_release_commit(version):
+def hash_files(paths, algorithms=("sha256",), max_workers=None):
+    """Hash files concurrently and report the throughput.
+
+    Parameters
+    ----------
+    paths : sequence of str
+        The paths to hash
+    algorithms : sequence of str, optional
+        The hashlib algorithm names to compute for each file
+    max_workers : int, optional
+        The number of hashing threads (defaults to one per file, up to the cpu count)
+
+    Returns
+    -------
+    dict
+        A mapping of path to a dict of algorithm name to hex digest
+    """
+    paths = list(paths)
+    if not paths:
+        return dict()
+
+    max_workers = max_workers or min(len(paths), os.cpu_count() or 1)
+    start = time.perf_counter()
+
+    # hashlib releases the GIL while digesting large buffers,
+    # so threads give real parallelism here
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda path: compute_digests(path, algorithms), paths)
+        digests = dict(zip(paths, results))
+
+    elapsed = time.perf_counter() - start
+    total = sum(osp.getsize(path) for path in paths)
+    rate = total / elapsed / 1e6 if elapsed else 0
+    print(
+        f"Hashed {len(paths)} file(s) ({total} bytes) in {elapsed:.3f}s ({rate:.1f} MB/s)"
+    )
+    return digests
+
+
+def create_release_commit(version, extra_hashes=()):
     """Generate a release commit that has the sha256 digests for the release files"""
     cmd = f'git commit -am "Publish {version}" -m "SHA256 hashes:"'
 
-    shas = dict()
+    paths = []
+    tarball = None
 
     if osp.exists("setup.py"):
         files = glob("dist/*")
         if not len(files) == 2:  # pragma: no cover
             raise ValueError("Missing distribution files")
 
-        for path in files:
-            path = normalize_path(path)
-            sha256 = compute_sha256(path)
-            shas[path] = sha256
-            cmd += f' -m "{path}: {sha256}"'
+        paths.extend(normalize_path(path) for path in files)
 
     if osp.exists("package.json"):
         data = json.loads(Path("package.json").read_text(encoding="utf-8"))
         if not data.get("private", False):
             npm = normalize_path(shutil.which("npm"))
-            filename = normalize_path(run(f"{npm} pack"))
-            sha256 = compute_sha256(filename)
-            shas[filename] = sha256
-            os.remove(filename)
-            cmd += f' -m "{filename}: {sha256}"'
+            # Build scripts can print before the tarball name on the last line
+            tarball = normalize_path(run(f"{npm} pack").splitlines()[-1])
+            paths.append(tarball)
+
+    algorithms = ("sha256",) + tuple(extra_hashes)
+    digests = hash_files(paths, algorithms)
+
+    if tarball:
+        os.remove(tarball)
+
+    shas = dict()
+    for path in paths:
+        shas[path] = digests[path]["sha256"]
+        cmd += f' -m "{path}: {shas[path]}"'
+
+    for name in extra_hashes:
+        cmd += f' -m "{name.upper()} hashes:"'
+        for path in paths:
+            cmd += f' -m "{path}: {digests[path][name]}"'
 
     run(cmd)
 
     return shas
 
 
+def get_md_files(ignore="", since=None):
+    """Get the Markdown files in the repository, including untracked ones.
+
+    Parameters
+    ----------
+    ignore : str, optional
+        Comma separated list of glob patterns to ignore
+    since : str, optional
+        Only include files changed since this git reference
+
+    Returns
+    -------
+    list of str
+        The file paths, relative to the current directory
+    """
+    untracked = run('git ls-files --others --exclude-standard "*.md"', quiet=True)
+    if since:
+        files = run(f'git diff --name-only --relative {since} -- "*.md"', quiet=True)
+    else:
+        files = run('git ls-files --cached "*.md"', quiet=True)
+    files = files.splitlines() + untracked.splitlines()
+
+    patterns = [spec.strip() for spec in ignore.split(",") if spec.strip()]
+    return [
+        path
+        for path in dict.fromkeys(files)
+        if osp.exists(path)
+        and not any(
+            fnmatch(path, spec) or fnmatch(osp.basename(path), spec)
+            for spec in patterns
+        )
+    ]
+
+
+def get_md_links_at(ref, paths):
+    """Get the links in Markdown files as they were at a git reference.
+
+    Returns
+    -------
+    dict
+        A mapping of file path to the set of links, for the files that
+        existed at the reference
+    """
+    from release_helper.links import extract_links
+
+    existing = set(run(f"git ls-tree -r --name-only {ref}", quiet=True).splitlines())
+    links = dict()
+    for path in paths:
+        if path in existing:
+            text = run(f"git show {ref}:./{path}", quiet=True)
+            links[path] = set(extract_links(text))
+    return links
+
+
+def get_build_requires(path):
+    """Get the build requirements of a Python project directory or dist file.
+
+    Wheels have no build requirements.  The PEP 517 defaults are used if the
+    project has no ``build-system`` table or no TOML parser is available.
+    """
+    data = None
+    if osp.isdir(path):
+        pyproject = osp.join(path, "pyproject.toml")
+        if osp.exists(pyproject):
+            data = load_toml(pyproject)
+    elif path.endswith(".tar.gz"):
+        import tarfile
+
+        with tarfile.open(path) as fid:
+            for name in fid.getnames():
+                if name.count("/") == 1 and name.endswith("/pyproject.toml"):
+                    text = fid.extractfile(name).read().decode("utf-8")
+                    data = parse_toml(text)
+                    break
+    else:
+        return []
+
+    default = ["setuptools>=40.8.0", "wheel"]
+    return ((data or dict()).get("build-system") or dict()).get("requires", default)
+
+
+def get_build_key(method):
+    """Get the build cache key for the Python package in the current directory.
+
+    The key covers the content of the tracked files, including uncommitted
+    changes, the build method, and the interpreter.  Returns None outside of
+    a git repository.
+    """
+    try:
+        # A stash commit captures the working tree without touching it
+        ref = run("git stash create", quiet=True) or "HEAD"
+        tree = run(f"git rev-parse {ref}^{{tree}}", quiet=True)
+    except CalledProcessError:  # pragma: no cover
+        return None
+
+    key = json.dumps([tree, method, sys.version, sys.platform])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_build_method(reuse_build_env=False):
+    """Get the method used to build the Python package in the current directory"""
+    if not osp.exists("./pyproject.toml"):
+        return "setup.py"
+    return "build-env" if reuse_build_env else "build"
+
+
+def get_build_env(requires, **kwargs):
+    """Get a cached environment with the given build requirements installed.
+
+    Parameters
+    ----------
+    requires : list of str
+        The ``build-system`` requirements
+    **kwargs
+        Keyword arguments passed to :func:`run`
+
+    Returns
+    -------
+    str
+        The path of the environment
+    """
+
+    def install(python, env_path):
+        reqs = " ".join(shlex.quote(req) for req in ["build"] + requires)
+        run(f"{python} -m pip install -q {reqs}", **kwargs)
+        return dict(requires=requires)
+
+    path, _ = get_cached_env("build-envs", sorted(requires), install, **kwargs)
+    return normalize_path(path)
+
+
+def build_dist_files(method):
+    """Build the Python dist files into ``./dist``.
+
+    With the ``build-env`` method, the sdist and the wheel built from it are
+    made in one pass without isolation, using a cached build environment.
+    """
+    if method == "setup.py":
+        run("python setup.py sdist")
+        run("python setup.py bdist_wheel")
+    elif method == "build-env":
+        env_path = get_build_env(get_build_requires("."))
+        run(f"{get_venv_bin(env_path)}/python -m build --no-isolation .")
+    else:
+        run("python -m build .")
+
+
+def get_venv_bin(env_path):
+    """Get the scripts directory of a virtual environment"""
+    if os.name == "nt":  # pragma: no cover
+        return f"{env_path}/Scripts"
+    return f"{env_path}/bin"
+
+
+def get_cached_env(name, key, install, **kwargs):
+    """Get a cached virtual environment, creating it if needed.
+
+    Environments are cached by interpreter and ``key``, so they are only set
+    up once per runner.  A lock lets concurrent jobs share the cache, a failed
+    install is never reused, and the least recently used environments are
+    evicted.
+
+    Parameters
+    ----------
+    name : str
+        The cache subdirectory for this kind of environment
+    key : list
+        JSON serializable values that identify the environment
+    install : callable
+        Called with the python executable and the path of a new environment
+        to set it up, and returns a dict of info to store with it
+    **kwargs
+        Keyword arguments passed to :func:`run`
+
+    Returns
+    -------
+    tuple
+        The environment path and its stored info
+    """
+    key = json.dumps([osp.realpath(sys.executable), sys.version, key])
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    root = osp.join(get_cache_dir(), name)
+    os.makedirs(root, exist_ok=True)
+    path = osp.join(root, f"{sys.implementation.cache_tag}-{digest}")
+    info_file = osp.join(path, "release-helper.json")
+
+    with file_lock(osp.join(root, ".lock")):
+        if not osp.exists(info_file):
+            # Build in a temporary location so a failed install is not reused
+            shutil.rmtree(path, ignore_errors=True)
+            temp_path = normalize_path(f"{path}.tmp")
+            shutil.rmtree(temp_path, ignore_errors=True)
+            python = f"{get_venv_bin(temp_path)}/python"
+            try:
+                run(f"{normalize_path(sys.executable)} -m venv {temp_path}", **kwargs)
+                info = install(python, temp_path)
+            except Exception:
+                shutil.rmtree(temp_path, ignore_errors=True)
+                raise
+            Path(temp_path, "release-helper.json").write_text(
+                json.dumps(info), encoding="utf-8"
+            )
+            os.replace(temp_path, path)
+
+        os.utime(path)
+        evict_dirs(root, cache.VENV_CACHE_MAX_AGE, cache.VENV_CACHE_MAX_ENTRIES)
+        info = json.loads(Path(info_file).read_text(encoding="utf-8"))
+
+    return path, info
+
+
+def get_venv_template(pip_args="", **kwargs):
+    """Get a cached base virtual environment with an upgraded pip.
+
+    Parameters
+    ----------
+    pip_args : str, optional
+        Extra arguments for upgrading pip, e.g. to use a local wheelhouse
+    **kwargs
+        Keyword arguments passed to :func:`run`
+
+    Returns
+    -------
+    tuple of str
+        The template path and its site-packages path relative to it
+    """
+    import ensurepip
+
+    def install(python, env_path):
+        run(f"{python} -m pip install -U pip {pip_args}".strip(), **kwargs)
+        code = "import sysconfig; print(sysconfig.get_path('purelib'))"
+        purelib = run(f'{python} -c "{code}"', **kwargs)
+        return dict(purelib=osp.relpath(purelib, env_path))
+
+    path, info = get_cached_env("venvs", ensurepip.version(), install, **kwargs)
+    return path, info["purelib"]
+
+
+def create_venv(env_path, pip_args="", **kwargs):
+    """Create an isolated virtual environment from the cached template.
+
+    The environment is created without pip, and a ``.pth`` file makes the
+    template's packages available to it, which takes well under a second.
+    Anything installed goes into the new environment.
+
+    Parameters
+    ----------
+    env_path : str
+        The path of the new environment
+    pip_args : str, optional
+        Extra arguments for upgrading pip in a new template
+    **kwargs
+        Keyword arguments passed to :func:`run`
+    """
+    template, purelib = get_venv_template(pip_args, **kwargs)
+    run(f"{normalize_path(sys.executable)} -m venv --without-pip {env_path}", **kwargs)
+    site_packages = Path(env_path, purelib)
+    site_packages.mkdir(parents=True, exist_ok=True)
+    site_packages.joinpath("release_helper_template.pth").write_text(
+        osp.join(template, purelib) + "\n", encoding="utf-8"
+    )
+
+
+def install_dist(bin_path, dist_file, wheelhouse=None, offline=False, **kwargs):
+    """Install a Python dist file, optionally from a local wheelhouse.
+
+    With a wheelhouse, the install is first attempted without an index.  If
+    that fails, the missing dependencies and build requirements are
+    downloaded into the wheelhouse for next time, unless ``offline`` is set.
+
+    Parameters
+    ----------
+    bin_path : str
+        The scripts directory of the environment
+    dist_file : str
+        The path to the dist file
+    wheelhouse : str, optional
+        The directory of cached dependencies
+    offline : bool, optional
+        Whether to only install from the wheelhouse
+    **kwargs
+        Keyword arguments passed to :func:`run`
+    """
+    pip = f"{bin_path}/python -m pip"
+    if not wheelhouse:
+        run(f"{pip} install -q {dist_file}", **kwargs)
+        return
+
+    local_install = f"{pip} install -q --no-index --find-links {wheelhouse} {dist_file}"
+    if offline:
+        run(local_install, **kwargs)
+        return
+
+    try:
+        run(local_install, **kwargs)
+        return
+    except CalledProcessError:
+        print("Filling the wheelhouse")
+
+    reqs = ["pip"] + get_build_requires(dist_file)
+    reqs = " ".join(shlex.quote(req) for req in reqs)
+    with file_lock(osp.join(wheelhouse, ".lock")):
+        run(f"{pip} download -q -d {wheelhouse} {dist_file} {reqs}", **kwargs)
+    run(local_install, **kwargs)
+
+
+def init_check_worker(trace_path):
+    """Set up a spawned dist file check process"""
+    if trace_path:
+        tracing.enable(trace_path)
+
+
+def check_dist(dist_file, test_cmd=None, cwd=None, wheelhouse=None, offline=False):
+    """Check a Python dist file and install it in an isolated environment.
+
+    Parameters
+    ----------
+    dist_file : str
+        The absolute path to the dist file
+    test_cmd : str, optional
+        The command to run in the environment (defaults to importing the
+        package)
+    cwd : str, optional
+        The directory to run the commands in
+    wheelhouse : str, optional
+        The directory of cached dependencies to install from
+    offline : bool, optional
+        Whether to only install from the wheelhouse
+
+    Returns
+    -------
+    tuple of str
+        The captured output, and the error message or None if the check passed
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            run(f"twine check {dist_file}", cwd=cwd, stderr=STDOUT)
+
+            if not test_cmd:
+                # Get the package name from the dist file name
+                name = re.match(r"(\S+)-\d", osp.basename(dist_file)).groups()[0]
+                name = name.replace("-", "_")
+                test_cmd = f'python -c "import {name}"'
+
+            # Create venvs to install dist file
+            # run the test command in the venv
+            with TemporaryDirectory() as td:
+                env_path = normalize_path(osp.abspath(td))
+                bin_path = get_venv_bin(env_path)
+
+                # Create the virtual env from the cached template,
+                # install, and run test command
+                kwargs = dict(cwd=cwd, stderr=STDOUT)
+                pip_args = f"--no-index --find-links {wheelhouse}" if offline else ""
+                create_venv(env_path, pip_args, **kwargs)
+                install_dist(bin_path, dist_file, wheelhouse, offline, **kwargs)
+                run(f"{bin_path}/{test_cmd}", **kwargs)
+        except Exception as e:
+            return output.getvalue(), str(e)
+        finally:
+            # Worker processes do not share the events of the main process
+            tracing.flush()
+
+    return output.getvalue(), None
+
+
 def bump_version(version_spec, version_cmd=""):
     """Bump the version"""
     # Look for config files to determine version command if not given
@@ -297,6 +1291,23 @@ def is_prerelease(version):
     return final_version != version
 
 
+def invoke_step(ctx, command, args):
+    """Invoke a command as a pipeline step, with environment variable defaults.
+
+    Parameters
+    ----------
+    ctx : click.Context
+        The context of the pipeline command
+    command : click.Command
+        The command to invoke
+    args : list of str or callable
+        The command line arguments, or a function that returns them
+    """
+    args = list(args() if callable(args) else args)
+    with command.make_context(command.name, args, parent=ctx) as sub_ctx:
+        command.invoke(sub_ctx)
+
+
 # """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 # Start CLI
 # """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
@@ -310,9 +1321,33 @@ class NaturalOrderGroup(click.Group):
 
 
 @click.group(cls=NaturalOrderGroup)
-def main():
+@click.option(
+    "--trace",
+    envvar="RELEASE_HELPER_TRACE",
+    help="Append the timing of each external action to a Chrome trace file",
+)
+@click.option(
+    "--record",
+    envvar="RELEASE_HELPER_RECORD",
+    help="Record the GitHub API interactions missing from a cassette directory",
+)
+@click.option(
+    "--replay",
+    envvar="RELEASE_HELPER_REPLAY",
+    help="Answer GitHub API requests from a recorded cassette directory",
+)
+@click.pass_context
+def main(ctx, trace, record, replay):
     """Release helper scripts"""
-    pass
+    if trace:
+        tracing.enable(trace)
+        ctx.call_on_close(tracing.finish)
+
+    if record and replay:  # pragma: no cover
+        raise ValueError("Cannot record and replay at the same time")
+    if record or replay:
+        cassette.enable(record or replay, "record" if record else "replay")
+        ctx.call_on_close(cassette.disable)
 
 
 # Extracted common options
@@ -341,6 +1376,24 @@ changelog_path_options = [
     ),
 ]
 
+changelog_archive_options = [
+    click.option(
+        "--archive-dir",
+        envvar="CHANGELOG_ARCHIVE_DIR",
+        default="changelog",
+        help="The directory of the changelog archive files",
+    ),
+]
+
+offline_options = [
+    click.option(
+        "--offline",
+        envvar="OFFLINE_INSTALL",
+        is_flag=True,
+        help="Only install dependencies from the local cache",
+    ),
+]
+
 changelog_options = (
     branch_options
     + auth_options
@@ -352,6 +1405,13 @@ changelog_options = (
             is_flag=True,
             help="Resolve backport PRs to their originals",
         ),
+        click.option(
+            "--changelog-engine",
+            envvar="CHANGELOG_ENGINE",
+            type=click.Choice(["github-activity", "graphql"]),
+            default="github-activity",
+            help="The backend used to generate changelog entries",
+        ),
     ]
 )
 
@@ -399,7 +1459,7 @@ def prep_env(version_spec, version_cmd, branch, remote, repo, auth, output):
         )
         run('git config --global user.name "GitHub Action"')
 
-        remotes = run("git remote").splitlines()
+        remotes = run("git remote", quiet=True).splitlines()
         if remote not in remotes:
             if auth:
                 username = os.environ["GITHUB_ACTOR"]
@@ -416,7 +1476,7 @@ def prep_env(version_spec, version_cmd, branch, remote, repo, auth, output):
     if "GITHUB_WORKFLOW" in os.environ:
         workflow = os.environ["GITHUB_WORKFLOW"]
         path = f"./github/workflows/{workflow}.yml"
-        diff = run(f"git --no-pager diff HEAD {remote}/{branch} -- {path}")
+        diff = run(f"git --no-pager diff HEAD {remote}/{branch} -- {path}", quiet=True)
         msg = f"Workflow file {workflow} differs from {remote} repo {repo}:\n{diff}"
         if path in diff:  # pragma: no cover
             raise ValueError(msg)
@@ -444,57 +1504,84 @@ IS_PRERELEASE={is_prerelease_str}
 
 @main.command()
 @add_options(changelog_options)
-def prep_changelog(branch, remote, repo, auth, changelog_path, resolve_backports):
+@click.option(
+    "--incremental",
+    envvar="CHANGELOG_INCREMENTAL",
+    is_flag=True,
+    help="Only fetch PRs merged since the entry was last updated",
+)
+def prep_changelog(
+    branch,
+    remote,
+    repo,
+    auth,
+    changelog_path,
+    resolve_backports,
+    changelog_engine,
+    incremental,
+):
     """Prep changelog entry"""
     branch = branch or get_branch()
 
     # Get the new version
     version = get_version()
 
-    # Get the existing changelog and run some validation
-    changelog = Path(changelog_path).read_text(encoding="utf-8")
+    # Find the current entry, without reading the rest of the changelog
+    start, end = find_changelog_markers(changelog_path)
+    stop = end + len(END_MARKER)
+    prev_entry = read_file_range(changelog_path, start, stop).decode("utf-8")
+    prev_entry = ChangelogEntry(prev_entry)
+    repo = repo or get_repo(remote, auth=auth)
+    now = datetime.now(timezone.utc)
+    entry = None
+
+    # Only fetch the PRs merged since the last update if we can
+    last_merged = incremental and prev_entry.last_merged
+    if last_merged and prev_entry.version == version:
+        entry = update_changelog_entry(
+            prev_entry.text,
+            f"{remote}/{branch}",
+            repo,
+            last_merged,
+            auth=auth,
+            resolve_backports=resolve_backports,
+        )
 
-    if START_MARKER not in changelog or END_MARKER not in changelog:
-        raise ValueError("Missing insert marker for changelog")
+    if entry is None:
+        # Get changelog entry
+        entry = get_changelog_entry(
+            f"{remote}/{branch}",
+            repo,
+            version,
+            auth=auth,
+            resolve_backports=resolve_backports,
+            engine=changelog_engine,
+            cache=True,
+        )
 
-    if changelog.find(START_MARKER) != changelog.rfind(START_MARKER):
-        raise ValueError("Insert marker appears more than once in changelog")
-
-    # Get changelog entry
-    repo = repo or get_repo(remote, auth=auth)
-    entry = get_changelog_entry(
-        f"{remote}/{branch}",
-        repo,
-        version,
-        auth=auth,
-        resolve_backports=resolve_backports,
-    )
+        # Test if we are augmenting an existing changelog entry (for new PRs)
+        # Preserve existing PR entries since we may have formatted them
+        if prev_entry.version == version:
+            entry = merge_entries(entry, prev_entry)
 
     # Insert the entry into the file
-    # Test if we are augmenting an existing changelog entry (for new PRs)
-    # Preserve existing PR entries since we may have formatted them
+    entry = strip_last_merged(entry).strip()
+    if incremental:
+        entry += f"\n\n{format_last_merged(now)}"
     new_entry = f"{START_MARKER}\n\n{entry}\n\n{END_MARKER}"
-    prev_entry = changelog[
-        changelog.index(START_MARKER) : changelog.index(END_MARKER) + len(END_MARKER)
-    ]
 
-    if f"# {version}" in prev_entry:
-        lines = new_entry.splitlines()
-        old_lines = prev_entry.splitlines()
-        for ind, line in enumerate(lines):
-            pr = re.search(r"\[#\d+\]", line)
-            if not pr:
-                continue
-            for old_line in prev_entry.splitlines():
-                if pr.group() in old_line:
-                    lines[ind] = old_line
-        changelog = changelog.replace(prev_entry, "\n".join(lines))
+    if prev_entry.version == version:
+        edits = [(start, stop, new_entry)]
     else:
-        changelog = changelog.replace(END_MARKER + "\n\n", "")
-        changelog = changelog.replace(END_MARKER + "\n", "")
-        changelog = changelog.replace(START_MARKER, new_entry)
+        # Keep the previous entry below the new one, dropping its end marker
+        after = read_file_range(changelog_path, stop, stop + 4)
+        trailing = re.match(rb"(\r?\n){0,2}", after).end()
+        edits = [
+            (start, start + len(START_MARKER), new_entry),
+            (end, stop + trailing, ""),
+        ]
 
-    Path(changelog_path).write_text(changelog, encoding="utf-8")
+    splice_file(changelog_path, edits)
 
     # Stage changelog
     run(f"git add {normalize_path(changelog_path)}")
@@ -506,7 +1593,14 @@ def prep_changelog(branch, remote, repo, auth, changelog_path, resolve_backports
     "--output", envvar="CHANGELOG_OUTPUT", help="The output file for changelog entry"
 )
 def check_changelog(
-    branch, remote, repo, auth, changelog_path, resolve_backports, output
+    branch,
+    remote,
+    repo,
+    auth,
+    changelog_path,
+    resolve_backports,
+    changelog_engine,
+    output,
 ):
     """Check changelog entry"""
     branch = branch or get_branch()
@@ -515,18 +1609,7 @@ def check_changelog(
     version = get_version()
 
     # Finalize changelog
-    changelog = Path(changelog_path).read_text(encoding="utf-8")
-
-    start = changelog.find(START_MARKER)
-    end = changelog.find(END_MARKER)
-
-    if start == -1 or end == -1:  # pragma: no cover
-        raise ValueError("Missing new changelog entry delimiter(s)")
-
-    if start != changelog.rfind(START_MARKER):  # pragma: no cover
-        raise ValueError("Insert marker appears more than once in changelog")
-
-    final_entry = changelog[start + len(START_MARKER) : end]
+    final_entry = read_changelog_entry(changelog_path)
 
     repo = repo or get_repo(remote, auth=auth)
     raw_entry = get_changelog_entry(
@@ -535,44 +1618,186 @@ def check_changelog(
         version,
         auth=auth,
         resolve_backports=resolve_backports,
+        engine=changelog_engine,
+        cache=True,
     )
 
-    if f"# {version}" not in final_entry:  # pragma: no cover
-        print(final_entry)
+    if final_entry.version != version:  # pragma: no cover
+        print(final_entry.text)
         raise ValueError(f"Did not find entry for {version}")
 
-    final_prs = re.findall(r"\[#(\d+)\]", final_entry)
-    raw_prs = re.findall(r"\[#(\d+)\]", raw_entry)
+    raw_entry = ChangelogEntry(raw_entry)
+    final_prs = set(final_entry.prs)
+    raw_prs = set(raw_entry.prs)
+    # Allow for changelog PR to not be in changelog itself
+    changelog_prs = set(
+        number
+        for (number, line) in raw_entry.prs.items()
+        if "changelog" in line.lower()
+    )
 
-    for pr in raw_prs:
-        # Allow for changelog PR to not be in changelog itself
-        skip = False
-        for line in raw_entry.splitlines():
-            if f"[#{pr}]" in line and "changelog" in line.lower():
-                skip = True
-                break
-        if skip:
-            continue
-        if not f"[#{pr}]" in final_entry:  # pragma: no cover
-            raise ValueError(f"Missing PR #{pr} in changelog")
-    for pr in final_prs:
-        if not f"[#{pr}]" in raw_entry:  # pragma: no cover
-            raise ValueError(f"PR #{pr} does not belong in changelog for {version}")
+    for pr in sorted(raw_prs - changelog_prs - final_prs):
+        raise ValueError(f"Missing PR #{pr} in changelog")
+    for pr in sorted(final_prs - raw_prs):  # pragma: no cover
+        raise ValueError(f"PR #{pr} does not belong in changelog for {version}")
 
     if output:
-        Path(output).write_text(final_entry, encoding="utf-8")
+        Path(output).write_text(final_entry.text, encoding="utf-8")
 
 
 @main.command()
-def build_python():
+@add_options(changelog_path_options)
+@add_options(changelog_archive_options)
+@click.option(
+    "--keep-releases",
+    envvar="CHANGELOG_KEEP_RELEASES",
+    default=20,
+    help="The number of releases to keep in the changelog",
+)
+@click.option(
+    "--keep-years",
+    envvar="CHANGELOG_KEEP_YEARS",
+    type=float,
+    help="Also archive the releases older than this number of years",
+)
+@click.option(
+    "--group-by",
+    envvar="CHANGELOG_ARCHIVE_BY",
+    type=click.Choice(["major", "year"]),
+    default="major",
+    help="Whether to make an archive file per major version or per year",
+)
+def archive_changelog(changelog_path, archive_dir, keep_releases, keep_years, group_by):
+    """Move old changelog entries to archive files"""
+    # Keep the exact bytes, so offsets match the file
+    text = Path(changelog_path).read_bytes().decode("utf-8")
+    changelog = Changelog(text)
+    released = [
+        entry
+        for entry in changelog.entries.values()
+        if entry is not changelog.new_entry
+    ]
+
+    dates = dict()
+    if keep_years or group_by == "year":
+        dates = get_tag_dates()
+    cutoff = keep_years and date.today() - timedelta(days=365.25 * keep_years)
+
+    # Archive every entry from the first one that is too old
+    archived = []
+    for (ind, entry) in enumerate(released):
+        entry_date = entry.date or dates.get(entry.version)
+        if ind >= keep_releases or (cutoff and entry_date and entry_date < cutoff):
+            archived = released[ind:]
+            break
+
+    if not archived:
+        print("No changelog entries to archive")
+        return
+
+    start = max(text.find(END_MARKER), 0)
+    pattern = rf"^## +{re.escape(archived[0].version)}(?=\s|$)"
+    match = re.compile(pattern, re.MULTILINE).search(text, start)
+    if not match:  # pragma: no cover
+        raise ValueError(f"Could not find the entry for {archived[0].version}")
+
+    # Write the archive files first, so the entries are never lost
+    os.makedirs(archive_dir, exist_ok=True)
+    groups = dict()
+    index = dict()
+    for entry in archived:
+        entry_date = entry.date or dates.get(entry.version)
+        name, title = get_archive_name(entry.version, group_by, entry_date)
+        groups.setdefault((name, title), []).append(entry)
+        index[entry.version] = name
+
+    for ((name, title), entries) in groups.items():
+        add_archive_entries(osp.join(archive_dir, name), title, entries)
+
+    index_path = osp.join(archive_dir, ARCHIVE_INDEX)
+    if osp.exists(index_path):
+        previous = parse_archive_index(Path(index_path).read_text(encoding="utf-8"))
+        for (version, name) in previous.items():
+            index.setdefault(version, name)
+    Path(index_path).write_text(format_archive_index(index), encoding="utf-8")
+
+    # Replace the archived entries with a link to the archive
+    link = osp.relpath(index_path, osp.dirname(osp.abspath(changelog_path)))
+    link = normalize_path(link)
+    block = (
+        f"{ARCHIVE_MARKER}\n\n"
+        f"Older releases are in the [changelog archive]({link}).\n"
+    )
+    offset = len(text[: match.start()].encode("utf-8"))
+    splice_file(changelog_path, [(offset, len(text.encode("utf-8")), block)])
+    print(f"Archived {len(archived)} changelog entries to {archive_dir}")
+
+    run(f"git add {normalize_path(changelog_path)} {normalize_path(archive_dir)}")
+
+
+@main.command()
+@add_options(changelog_path_options)
+@add_options(changelog_archive_options)
+@click.option(
+    "--version",
+    "version_",
+    help="The release version (defaults to the current version)",
+)
+def show_changelog(changelog_path, archive_dir, version_):
+    """Show the changelog entry of a release"""
+    version_ = version_ or get_version()
+    entry = find_changelog_entry(changelog_path, version_, archive_dir)
+    if entry is None:
+        raise ValueError(f"No changelog entry found for {version_}")
+    print(entry.text)
+
+
+@main.command()
+@click.option(
+    "--no-build-cache",
+    envvar="NO_BUILD_CACHE",
+    is_flag=True,
+    help="Always rebuild instead of restoring cached dist files",
+)
+@click.option(
+    "--reuse-build-env",
+    envvar="REUSE_BUILD_ENV",
+    is_flag=True,
+    help="Build the sdist and wheel in one pass with a cached build environment",
+)
+def build_python(no_build_cache, reuse_build_env):
     """Build Python dist files"""
     shutil.rmtree("./dist", ignore_errors=True)
 
-    if osp.exists("./pyproject.toml"):
-        run("python -m build .")
-    else:
-        run("python setup.py sdist")
-        run("python setup.py bdist_wheel")
+    method = get_build_method(reuse_build_env)
+    key = None if no_build_cache else get_build_key(method)
+    if not key:
+        build_dist_files(method)
+        return
+
+    root = osp.join(get_cache_dir(), "builds")
+    os.makedirs(root, exist_ok=True)
+    path = osp.join(root, key)
+    lock = osp.join(root, ".lock")
+
+    with file_lock(lock):
+        if osp.isdir(path):
+            print(f"Restoring cached dist files for {key[:12]}")
+            shutil.copytree(path, "./dist")
+            os.utime(path)
+            return
+
+    build_dist_files(method)
+
+    with file_lock(lock):
+        if not osp.isdir(path):
+            shutil.copytree("./dist", path)
+        evict_dirs(
+            root,
+            cache.BUILD_CACHE_MAX_AGE,
+            cache.BUILD_CACHE_MAX_ENTRIES,
+            cache.BUILD_CACHE_MAX_SIZE,
+        )
 
 
 @main.command()
@@ -580,33 +1805,50 @@ def build_python():
 @click.option(
     "--test-cmd", envvar="PY_TEST_CMD", help="The command to run in the test venvs"
 )
-def check_python(dist_files, test_cmd):
+@click.option(
+    "--wheelhouse",
+    envvar="PY_WHEELHOUSE",
+    help="A directory of cached dependencies to install from",
+)
+@add_options(offline_options)
+def check_python(dist_files, test_cmd, wheelhouse, offline):
     """Check Python dist files"""
-    for dist_file in dist_files:
-        dist_file = normalize_path(dist_file)
-        run(f"twine check {dist_file}")
-
-        if not test_cmd:
-            # Get the package name from the dist file name
-            name = re.match(r"(\S+)-\d", osp.basename(dist_file)).groups()[0]
-            name = name.replace("-", "_")
-            test_cmd = f'python -c "import {name}"'
-
-        # Create venvs to install dist file
-        # run the test command in the venv
-        with TemporaryDirectory() as td:
-            env_path = normalize_path(osp.abspath(td))
-            if os.name == "nt":  # pragma: no cover
-                bin_path = f"{env_path}/Scripts/"
-            else:
-                bin_path = f"{env_path}/bin"
-
-            # Create the virtual env, upgrade pip,
-            # install, and run test command
-            run(f"python -m venv {env_path}")
-            run(f"{bin_path}/python -m pip install -U pip")
-            run(f"{bin_path}/pip install -q {dist_file}")
-            run(f"{bin_path}/{test_cmd}")
+    dist_files = [normalize_path(osp.abspath(f)) for f in dist_files]
+    if offline and not wheelhouse:
+        wheelhouse = osp.join(get_cache_dir(), "wheelhouse")
+    if wheelhouse:
+        wheelhouse = normalize_path(osp.abspath(wheelhouse))
+        os.makedirs(wheelhouse, exist_ok=True)
+    max_workers = max(1, min(len(dist_files), os.cpu_count() or 1))
+
+    # Check each dist file in its own process, and report the output of
+    # each one in turn so that one failure does not hide the others
+    errors = []
+    kwargs = dict(max_workers=max_workers)
+    if sys.version_info >= (3, 7):
+        # Spawn the workers, since forking while other pipeline steps run on
+        # sibling threads can leave a lock held forever in the worker
+        kwargs.update(
+            mp_context=get_context("spawn"),
+            initializer=init_check_worker,
+            initargs=(tracing.get_path(),),
+        )
+    with ProcessPoolExecutor(**kwargs) as executor:
+        futures = [
+            executor.submit(
+                check_dist, dist_file, test_cmd, os.getcwd(), wheelhouse, offline
+            )
+            for dist_file in dist_files
+        ]
+        for (dist_file, future) in zip(dist_files, futures):
+            output, error = future.result()
+            print(f"Checking {osp.basename(dist_file)}")
+            print(output.rstrip())
+            if error:
+                errors.append(f"{osp.basename(dist_file)}: {error}")
+
+    if errors:
+        raise ValueError("Dist file checks failed:\n" + "\n".join(errors))
 
 
 @main.command()
@@ -614,14 +1856,18 @@ def check_python(dist_files, test_cmd):
 @click.option(
     "--test-cmd", envvar="NPM_TEST_CMD", help="The command to run in isolated install."
 )
-def check_npm(package, test_cmd):
+@click.option(
+    "--npm-cache", envvar="NPM_CACHE_DIR", help="A directory to cache npm packages in"
+)
+@add_options(offline_options)
+def check_npm(package, test_cmd, npm_cache, offline):
     """Check npm package"""
     npm = normalize_path(shutil.which("npm"))
     node = normalize_path(shutil.which("node"))
 
     if osp.isdir(package):
         should_remove = True
-        tarball = osp.join(os.getcwd(), run(f"{npm} pack"))
+        tarball = osp.join(os.getcwd(), run(f"{npm} pack").splitlines()[-1])
     else:
         should_remove = True
         tarball = package
@@ -629,6 +1875,8 @@ def check_npm(package, test_cmd):
     tarball = normalize_path(tarball)
 
     # Get the package json info from the tarball
+    import tarfile
+
     fid = tarfile.open(tarball)
     data = fid.extractfile("package/package.json").read()
     data = json.loads(data.decode("utf-8"))
@@ -647,10 +1895,19 @@ def check_npm(package, test_cmd):
         name = data["name"]
         test_cmd = f"{node} -e \"require('{name}')\""
 
+    # Use the cache for dependencies, fetching only what is missing
+    install_args = ""
+    if offline and not npm_cache:
+        npm_cache = osp.join(get_cache_dir(), "npm")
+    if npm_cache:
+        npm_cache = normalize_path(osp.abspath(npm_cache))
+        mode = "--offline" if offline else "--prefer-offline"
+        install_args = f"--cache {npm_cache} {mode} "
+
     # Install in a temporary directory and verify import
     with TemporaryDirectory() as tempdir:
         run(f"{npm} init -y", cwd=tempdir)
-        run(f"{npm} install {tarball}", cwd=tempdir)
+        run(f"{npm} install {install_args}{tarball}", cwd=tempdir)
         run(test_cmd, cwd=tempdir)
 
     # Remove the tarball
@@ -665,40 +1922,67 @@ def check_manifest():
 
 
 @main.command()
+@add_options(changelog_archive_options)
 @click.option(
     "--ignore",
-    default="CHANGELOG.md",
-    help="Comma separated list of glob patterns to ignore",
+    help="Comma separated list of glob patterns to ignore (defaults to the "
+    "changelog and its archive)",
 )
 @click.option(
-    "--cache-file", default="~/.cache/pytest-link-check", help="The cache file to use"
+    "--cache-file", help="The link cache database to use, or a directory to put it in"
 )
 @click.option(
     "--links-expire",
     default=604800,
     help="Duration in seconds for links to be cached (default one week)",
 )
-def check_md_links(ignore, cache_file, links_expire):
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Check all files instead of those changed since the last release",
+)
+def check_md_links(archive_dir, ignore, cache_file, links_expire, full):
     """Check Markdown file links"""
-    cache_dir = osp.expanduser(cache_file).replace(os.sep, "/")
-    os.makedirs(cache_dir, exist_ok=True)
-    cmd = "pytest --check-links --check-links-cache "
-    cmd += f"--check-links-cache-expire-after {links_expire} "
-    cmd += f"--check-links-cache-name {cache_dir}/check-md-links "
-    cmd += " -k .md "
+    from release_helper.links import check_links
 
-    for spec in ignore.split(","):
-        cmd += f"--ignore-glob {spec}"
+    if ignore is None:
+        ignore = f"CHANGELOG.md,{normalize_path(osp.relpath(archive_dir))}/*"
 
-    try:
-        run(cmd)
-    except Exception:
-        run(cmd + " --lf")
+    since = None
+    if not full:
+        try:
+            since = get_previous_tag("HEAD")
+        except (CalledProcessError, ValueError):
+            print("No previous release found, checking all files")
+
+    paths = get_md_files(ignore, since)
+    unchanged = None
+    if since:
+        print(f"Checking {len(paths)} files changed since {since}")
+        unchanged = get_md_links_at(since, paths)
+
+    cache_path = osp.expanduser(cache_file) if cache_file else None
+    if cache_path and osp.isdir(cache_path):
+        # The option used to name a cache directory, so keep those working
+        cache_path = osp.join(cache_path, "links.sqlite")
+    failures = check_links(paths, links_expire, cache_path, unchanged)
+    for (path, links) in failures.items():
+        for (link, reason) in links:
+            print(f"{path}: {link} ({reason})")
+
+    if failures:
+        raise ValueError("Found broken links")
 
 
 @main.command()
 @add_options(branch_options)
-def tag_release(branch, remote, repo):
+@click.option(
+    "--extra-hashes",
+    envvar="EXTRA_HASHES",
+    default="",
+    help="Comma separated list of additional digests to record (e.g. sha512,blake2b)",
+)
+def tag_release(branch, remote, repo, extra_hashes):
     """Create release commit and tag"""
     # Get the new version
     version = get_version()
@@ -706,8 +1990,14 @@ def tag_release(branch, remote, repo):
     # Get the branch
     branch = branch or get_branch()
 
+    # Validate the extra digest names
+    extra_hashes = [name.strip() for name in extra_hashes.split(",") if name.strip()]
+    for name in extra_hashes:
+        if name not in hashlib.algorithms_available:  # pragma: no cover
+            raise ValueError(f"Unsupported hash algorithm {name}")
+
     # Create the release commit
-    create_release_commit(version)
+    create_release_commit(version, extra_hashes=extra_hashes)
 
     # Create the annotated release tag
     tag_name = f"v{version}"
@@ -737,14 +2027,12 @@ def publish_release(
 
     version = get_version()
 
-    g = Github(auth)
-    r = g.get_repo(repo)
+    from release_helper.github_client import get_github
 
-    changelog = Path(changelog_path).read_text(encoding="utf-8")
+    g = get_github(auth)
+    r = g.get_repo(repo)
 
-    start = changelog.find(START_MARKER)
-    end = changelog.find(END_MARKER)
-    message = changelog[start + len(START_MARKER) : end]
+    message = read_changelog_entry(changelog_path).text
 
     prerelease = is_prerelease(version)
     release = r.create_git_release(
@@ -768,5 +2056,67 @@ def publish_release(
             run(f"git push {remote} {branch}")
 
 
+@main.command()
+@click.option(
+    "--version-spec",
+    envvar="VERSION_SPEC",
+    required=True,
+    help="The new version specifier",
+)
+@add_options(branch_options)
+@add_options(auth_options)
+@click.option(
+    "--skip",
+    envvar="PIPELINE_SKIP",
+    default="",
+    help="Comma separated list of steps to skip (e.g. check-md-links)",
+)
+@click.option(
+    "--max-workers", default=4, help="The maximum number of steps to run at once"
+)
+@click.pass_context
+def pipeline(ctx, version_spec, branch, remote, repo, auth, skip, max_workers):
+    """Run the release steps up to tagging as a concurrent pipeline"""
+    from release_helper.pipeline import run_pipeline
+
+    # Resolve the shared state once for all of the steps
+    branch = branch or get_branch()
+    repo = repo or get_repo(remote, auth=auth)
+    branch_args = ["--branch", branch, "--remote", remote, "--repo", repo]
+    auth_args = ["--auth", auth] if auth else []
+
+    is_python = osp.exists("setup.py") or osp.exists("pyproject.toml")
+    is_npm = osp.exists("package.json")
+
+    # Each step is a command, its arguments, its dependencies, and whether it
+    # applies to this package.  The dist files are only known after the build.
+    prep_args = ["--version-spec", version_spec] + branch_args + auth_args
+    dist_files = lambda: sorted(glob("dist/*"))  # noqa: E731
+    release_deps = ["check-changelog", "build-python", "check-python"]
+    release_deps += ["check-npm", "check-manifest", "check-md-links"]
+    spec = [
+        ("prep-env", prep_args, [], True),
+        ("prep-changelog", branch_args + auth_args, ["prep-env"], True),
+        ("check-changelog", branch_args + auth_args, ["prep-changelog"], True),
+        ("build-python", [], ["prep-changelog"], is_python),
+        ("check-python", dist_files, ["build-python"], is_python),
+        ("check-npm", [], ["prep-changelog"], is_npm),
+        ("check-manifest", [], ["prep-changelog"], is_python),
+        ("check-md-links", [], ["prep-changelog"], True),
+        ("tag-release", branch_args, release_deps, True),
+    ]
+
+    skip = [name.strip() for name in skip.split(",") if name.strip()]
+    steps = dict()
+    for (name, args, deps, enabled) in spec:
+        if enabled and name not in skip:
+            func = partial(invoke_step, ctx, main.commands[name], args)
+            steps[name] = (deps, func)
+
+    failed = run_pipeline(steps, max_workers=max_workers)
+    if failed:
+        raise ValueError(f"Pipeline steps failed: {', '.join(failed)}")
+
+
 if __name__ == "__main__":  # pragma: no cover
     main()
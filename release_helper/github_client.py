@@ -0,0 +1,210 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+import inspect
+import os
+from functools import lru_cache
+from urllib.parse import urlparse
+
+import requests
+from github import Github
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from release_helper import tracing
+from release_helper.cache import PRCache
+
+GITHUB_API = "https://api.github.com"
+HTTP_TIMEOUT = (10, 60)
+# Revalidating a cached entry should not wait long before using it offline
+REVALIDATE_TIMEOUT = (3, 60)
+HTTP_POOL_SIZE = 16
+HTTP_RETRIES = 5
+# Hosts of local stand-ins for GitHub, which have no rate limits
+LOCAL_HOSTS = ("127.0.0.1", "localhost")
+
+
+class GitHubRetry(Retry):
+    """Retry policy that also backs off on GitHub secondary rate limits.
+
+    Secondary rate limits are reported as a 403 with a ``Retry-After`` header,
+    and the request was rejected outright, so it is safe to retry any method.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if self.total and status_code == 403 and has_retry_after:
+            return True
+        return super().is_retry(method, status_code, has_retry_after=has_retry_after)
+
+
+def make_retry(connect=None):
+    """Make the retry policy used for GitHub requests.
+
+    Pass ``connect=0`` to fail at once when GitHub cannot be reached.
+    """
+    return GitHubRetry(
+        total=HTTP_RETRIES,
+        connect=connect,
+        backoff_factor=1,
+        status_forcelist=(500, 502, 503, 504),
+        raise_on_status=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_session(connect_retries=None):
+    """Get the shared keep-alive HTTP session used for GitHub REST calls.
+
+    Requests that have a cached fallback use ``connect_retries=0``, so that
+    they do not back off and retry when offline.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=make_retry(connect=connect_retries),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept"] = "application/vnd.github.v3+json"
+    return session
+
+
+def get_api_url():
+    """Get the GitHub API URL, which can be set with ``GITHUB_API_URL``"""
+    return os.environ.get("GITHUB_API_URL", GITHUB_API).rstrip("/")
+
+
+def get_github(auth=None):
+    """Get a PyGithub client that shares our timeout and retry policy"""
+    return _get_github(auth, get_api_url())
+
+
+@lru_cache(maxsize=None)
+def _get_github(auth, base_url):
+    kwargs = dict()
+    # PyGithub 2.1+ spaces out its requests, which only slows a local server
+    local = urlparse(base_url).hostname in LOCAL_HOSTS
+    if local and "seconds_between_writes" in inspect.signature(Github).parameters:
+        kwargs.update(seconds_between_requests=0, seconds_between_writes=0)
+    return Github(
+        auth,
+        base_url=base_url,
+        timeout=HTTP_TIMEOUT[1],
+        retry=make_retry(),
+        pool_size=HTTP_POOL_SIZE,
+        **kwargs,
+    )
+
+
+def github_api(path, auth=None, method="GET", session=None, **kwargs):
+    """Make a request to the GitHub REST API using the shared session.
+
+    Parameters
+    ----------
+    path : str
+        The API path, e.g. ``repos/{owner}/{repo}``
+    auth : str, optional
+        The GitHub authorization token
+    method : str, optional
+        The HTTP method
+    session : requests.Session, optional
+        The session to use instead of the shared one
+    **kwargs
+        Extra arguments passed to ``requests.Session.request``
+
+    Returns
+    -------
+    requests.Response
+        The successful response
+    """
+    headers = kwargs.pop("headers", dict())
+    if auth:
+        headers["Authorization"] = f"token {auth}"
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    with tracing.span(f"{method} {path}", "github") as info:
+        r = (session or get_session()).request(
+            method, f"{get_api_url()}/{path}", headers=headers, **kwargs
+        )
+        info.update(status=r.status_code, output_bytes=len(r.content))
+    r.raise_for_status()
+    return r
+
+
+def github_graphql(query, auth=None, **variables):
+    """Run a query against the GitHub GraphQL API using the shared session.
+
+    Parameters
+    ----------
+    query : str
+        The GraphQL query
+    auth : str, optional
+        The GitHub authorization token
+    **variables
+        The query variables
+
+    Returns
+    -------
+    dict
+        The ``data`` member of the response
+    """
+    r = github_api(
+        "graphql", auth=auth, method="POST", json=dict(query=query, variables=variables)
+    )
+    data = r.json()
+    if data.get("errors"):
+        raise ValueError(f"GraphQL query failed: {data['errors']}")
+    return data["data"]
+
+
+def get_pr_data(target, number, auth=None):
+    """Get the metadata for a PR, using the on-disk cache when possible.
+
+    Stale cache entries are revalidated with their ETag, and are used as-is
+    when GitHub cannot be reached.
+
+    Parameters
+    ----------
+    target : str
+        The GitHub organization/repo
+    number : int
+        The PR number
+    auth : str, optional
+        The GitHub authorization token
+
+    Returns
+    -------
+    dict
+        The PR metadata from the GitHub REST API
+    """
+    cache = PRCache()
+    cached = cache.get(target, number)
+    if cached and cached.fresh:
+        return cached.data
+
+    headers = dict()
+    kwargs = dict()
+    if cached:
+        # Fall back on the cached data quickly when GitHub is unreachable
+        kwargs = dict(
+            session=get_session(connect_retries=0), timeout=REVALIDATE_TIMEOUT
+        )
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+
+    try:
+        r = github_api(
+            f"repos/{target}/pulls/{number}", auth=auth, headers=headers, **kwargs
+        )
+    except (requests.ConnectionError, requests.Timeout):
+        if not cached:
+            raise
+        print(f"Using cached data for {target}#{number} (GitHub unreachable)")
+        return cached.data
+
+    if r.status_code == 304:
+        cache.touch(target, number)
+        return cached.data
+
+    data = r.json()
+    cache.set(target, number, data, etag=r.headers.get("ETag"))
+    return data
@@ -0,0 +1,188 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+import asyncio
+import os.path as osp
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import unquote
+from urllib.parse import urlparse
+
+from release_helper.cache import LINK_CACHE_MAX_AGE
+from release_helper.cache import LinkCache
+
+LINK_WORKERS = 16
+LINKS_PER_HOST = 4
+LINK_TIMEOUT = (10, 30)
+LINK_RETRIES = 2
+
+FENCE_PATTERN = re.compile(r"^ {0,3}(```|~~~).*?^ {0,3}\1", re.MULTILINE | re.DOTALL)
+CODE_SPAN_PATTERN = re.compile(r"`[^`\n]+`")
+MD_LINK_PATTERN = re.compile(r"\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+URL_PATTERN = re.compile(r"https?://[^\s<>()\[\]\"'`]+")
+SCHEME_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+def extract_links(text):
+    """Extract the links from Markdown text.
+
+    Both Markdown links and bare URLs are found.  Links in code blocks and
+    code spans are skipped.
+
+    Parameters
+    ----------
+    text : str
+        The Markdown text
+
+    Returns
+    -------
+    list of str
+        The unique links, in order of appearance
+    """
+    text = FENCE_PATTERN.sub("", text)
+    text = CODE_SPAN_PATTERN.sub("", text)
+    links = MD_LINK_PATTERN.findall(text)
+    links += [url.rstrip(".,;:!?") for url in URL_PATTERN.findall(text)]
+    return list(dict.fromkeys(links))
+
+
+def is_url(link):
+    """Whether a link is a web URL"""
+    return link.startswith(("http://", "https://"))
+
+
+def check_file_link(path, link):
+    """Check that a relative link in a Markdown file points to a file"""
+    target = unquote(link.split("#")[0].split("?")[0])
+    if not target:
+        return True
+    if target.startswith("/"):
+        return osp.exists(target.lstrip("/"))
+    return osp.exists(osp.join(osp.dirname(path), target))
+
+
+@lru_cache(maxsize=None)
+def get_link_session():
+    """Get the shared keep-alive HTTP session used for checking links"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=LINK_WORKERS,
+        pool_maxsize=LINKS_PER_HOST,
+        max_retries=LINK_RETRIES,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def check_url(url):
+    """Check a URL with a HEAD request, falling back to GET.
+
+    Returns
+    -------
+    tuple
+        Whether the link is valid, and the status code or error
+    """
+    import requests
+
+    session = get_link_session()
+    kwargs = dict(allow_redirects=True, timeout=LINK_TIMEOUT)
+    try:
+        resp = session.head(url, **kwargs)
+        if resp.status_code >= 400:
+            # Some servers do not support HEAD requests
+            resp = session.get(url, stream=True, **kwargs)
+            resp.close()
+    except requests.RequestException as e:
+        return False, type(e).__name__
+    return resp.status_code < 400, str(resp.status_code)
+
+
+async def check_urls(urls):
+    """Check URLs concurrently, with a limit on the requests to each host.
+
+    Returns
+    -------
+    dict
+        A mapping of URL to the output of :func:`check_url`
+    """
+    loop = asyncio.get_event_loop()
+    hosts = defaultdict(lambda: asyncio.Semaphore(LINKS_PER_HOST))
+
+    with ThreadPoolExecutor(max_workers=LINK_WORKERS) as executor:
+
+        async def check(url):
+            async with hosts[urlparse(url).netloc]:
+                return await loop.run_in_executor(executor, check_url, url)
+
+        results = await asyncio.gather(*[check(url) for url in urls])
+
+    return dict(zip(urls, results))
+
+
+def check_links(paths, links_expire, cache_path=None, unchanged=None):
+    """Check the links in Markdown files.
+
+    Web links that were valid within ``links_expire`` seconds are not
+    checked again.  Relative links must point to existing files.
+
+    Parameters
+    ----------
+    paths : list of str
+        The Markdown files to check
+    links_expire : int
+        The duration in seconds for valid links to be cached
+    cache_path : str, optional
+        The link cache database to use
+    unchanged : dict, optional
+        A mapping of file path to the links it had at the last release.
+        These are served from the cache regardless of ``links_expire``
+
+    Returns
+    -------
+    dict
+        A mapping of file path to a list of ``(link, reason)`` for each
+        broken link
+    """
+    links = dict()
+    for path in paths:
+        with open(path, encoding="utf-8") as fid:
+            links[path] = [
+                link
+                for link in extract_links(fid.read())
+                if is_url(link) or not SCHEME_PATTERN.match(link)
+            ]
+
+    cache = LinkCache(cache_path)
+    valid = cache.get_valid(links_expire)
+    if unchanged:
+        previous = cache.get_valid(LINK_CACHE_MAX_AGE)
+        for path in paths:
+            valid.update(previous & unchanged.get(path, set()))
+    all_urls = set(link for path in paths for link in links[path] if is_url(link))
+    urls = sorted(all_urls - valid)
+    print(f"Checking {len(urls)} links ({len(all_urls) - len(urls)} cached)")
+
+    results = dict()
+    if urls:
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(check_urls(urls))
+        finally:
+            loop.close()
+    cache.set_valid([url for url in urls if results[url][0]])
+
+    failures = dict()
+    for path in paths:
+        for link in links[path]:
+            if is_url(link):
+                ok, reason = results.get(link, (True, "cached"))
+            else:
+                ok, reason = check_file_link(path, link), "missing file"
+            if not ok:
+                failures.setdefault(path, []).append((link, reason))
+    return failures
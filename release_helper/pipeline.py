@@ -0,0 +1,115 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+import io
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from release_helper import tracing
+
+
+class StepOutput(io.TextIOBase):
+    """A stdout proxy that collects the output of each pipeline step.
+
+    Output written from a thread that is running a step goes to the buffer
+    of that step, and anything else goes to the original stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "buffer", None) or self.stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+
+def run_step(name, func, output):
+    """Run a pipeline step, capturing its output.
+
+    Returns
+    -------
+    tuple
+        The captured output, the error message or None if the step passed,
+        and the duration in seconds
+    """
+    output.local.buffer = io.StringIO()
+    start = time.time()
+    error = None
+    try:
+        with tracing.span(name, "step"):
+            func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        text = output.local.buffer.getvalue()
+        output.local.buffer = None
+    return text, error, time.time() - start
+
+
+def run_pipeline(steps, max_workers=4):
+    """Run steps as a dependency graph, running independent steps concurrently.
+
+    A step starts as soon as all of its dependencies have passed.  Steps that
+    depend on a failed step are skipped, and the output of each step is
+    printed as a block when it finishes.
+
+    Parameters
+    ----------
+    steps : dict
+        A mapping of step name to a tuple of the names of the steps it
+        depends on and a function that runs it.  Dependencies that are not
+        in the pipeline are ignored
+    max_workers : int, optional
+        The maximum number of steps to run at once
+
+    Returns
+    -------
+    dict
+        A mapping of the name of each failed step to its error message
+    """
+    pending = dict(steps)
+    passed = set()
+    failed = dict()
+    futures = dict()
+    output = StepOutput(sys.stdout)
+
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or futures:
+                for (name, (deps, func)) in list(pending.items()):
+                    deps = [dep for dep in deps if dep in steps]
+                    if any(dep in failed for dep in deps):
+                        failed[name] = "Skipped after a failed dependency"
+                        del pending[name]
+                    elif all(dep in passed for dep in deps):
+                        future = executor.submit(run_step, name, func, output)
+                        futures[future] = name
+                        del pending[name]
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    text, error, elapsed = future.result()
+                    status = "failed" if error else "passed"
+                    print(f"=== {name} {status} in {elapsed:.1f}s ===")
+                    if text.strip():
+                        print(text.rstrip())
+                    if error:
+                        print(error)
+                        failed[name] = error
+                    else:
+                        passed.add(name)
+    finally:
+        sys.stdout = output.stream
+
+    return failed
@@ -0,0 +1,125 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Timing traces for the external actions of the release helper.
+
+Traces are written in the Chrome trace event format, which can be opened in
+https://ui.perfetto.dev or ``chrome://tracing``.
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from release_helper.cache import file_lock
+
+SUMMARY_ROWS = 20
+
+# Credentials in event names, such as tokens in remote URLs, and their mask
+SECRET_PATTERNS = [
+    (re.compile(r"(\w+://)[^/\s@]+@"), r"\1***@"),
+    (re.compile(r"(--auth[= ])\S+"), r"\1***"),
+]
+
+# The trace file and the events recorded in this process, when tracing
+_trace = dict(path=None, events=[])
+
+
+def enable(path):
+    """Record trace events, to be written to ``path``"""
+    _trace["path"] = os.path.abspath(path)
+
+
+def redact(text):
+    """Mask the credentials in text, which trace files must not contain"""
+    for (pattern, mask) in SECRET_PATTERNS:
+        text = pattern.sub(mask, text)
+    return text
+
+
+def get_path():
+    """The trace file, or None when not tracing"""
+    return _trace["path"]
+
+
+def is_enabled():
+    """Whether trace events are being recorded"""
+    return _trace["path"] is not None
+
+
+@contextmanager
+def span(name, category, **args):
+    """Record the duration of a block as a trace event.
+
+    Yields a dict that the block can update with extra event arguments, such
+    as an exit code or output size.
+    """
+    args = dict(args)
+    if not is_enabled():
+        yield args
+        return
+
+    start = time.time()
+    try:
+        yield args
+    finally:
+        end = time.time()
+        _trace["events"].append(
+            dict(
+                name=redact(name),
+                cat=category,
+                ph="X",
+                ts=int(start * 1e6),
+                dur=int((end - start) * 1e6),
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+                args=args,
+            )
+        )
+
+
+def flush():
+    """Append the events recorded in this process to the trace file.
+
+    Forked worker processes inherit the events of their parent, so only the
+    events of the current process are written.  Returns the written events.
+    """
+    pid = os.getpid()
+    events = [event for event in _trace["events"] if event["pid"] == pid]
+    _trace["events"] = []
+    if not is_enabled() or not events:
+        return events
+
+    path = _trace["path"]
+    with file_lock(f"{path}.lock"):
+        data = dict(traceEvents=[])
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fid:
+                data = json.load(fid)
+        data["traceEvents"].extend(events)
+        with open(path, "w", encoding="utf-8") as fid:
+            json.dump(data, fid)
+    return events
+
+
+def format_summary(events, rows=SUMMARY_ROWS):
+    """Format a table of the slowest events"""
+    lines = [f"{'Seconds':>8} {'Code':>4} {'Output':>9}  Action"]
+    for event in sorted(events, key=lambda e: e["dur"], reverse=True)[:rows]:
+        args = event["args"]
+        code = args.get("returncode", args.get("status", ""))
+        size = args.get("output_bytes", "")
+        lines.append(f"{event['dur'] / 1e6:8.2f} {code:>4} {size:>9}  {event['name']}")
+    total = sum(event["dur"] for event in events) / 1e6
+    lines.append(f"{total:8.2f} total for {len(events)} actions")
+    return "\n".join(lines)
+
+
+def finish():
+    """Write the recorded events, print a summary of them, and stop tracing"""
+    events = flush()
+    if events:
+        print(format_summary(events))
+        print(f"Wrote trace to {_trace['path']}")
+    _trace["path"] = None